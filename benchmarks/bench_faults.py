@@ -0,0 +1,151 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+from core.config import FAULT_LEVELS
+from core.config_editor import get_config
+from faults import apply_fault, apply_fault_batch
+from faults.dispatcher import FAULT_FUNCTIONS, BATCH_FUNCTIONS
+
+RESOLUTIONS = {
+    "64": (64, 64),
+    "224": (224, 224),
+    "vga": (640, 480),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+
+def bench_fault(fault, level, image, repeat, config):
+    fn = FAULT_FUNCTIONS[fault]
+    times = []
+    for n in range(repeat + 1):
+        rng = np.random.default_rng(n)
+        start = time.perf_counter()
+        fn(image, level, rng=rng, config=config)
+        times.append(time.perf_counter() - start)
+    # The first call warms caches (remap maps, sensor defects) and is not counted
+    times = times[1:]
+
+    # Allocations are measured on a separate call because tracing slows everything down. tracemalloc
+    # only sees the Python heap (NumPy arrays included); OpenCV's own buffers are not counted.
+    tracemalloc.start()
+    fn(image, level, rng=np.random.default_rng(0), config=config)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = float(np.median(times)) * 1000
+    h, w = image.shape[:2]
+    return {
+        "ms_per_frame": round(ms, 3),
+        "best_ms": round(min(times) * 1000, 3),
+        "mp_per_s": round(w * h / 1e6 / (ms / 1000), 2),
+        "peak_py_heap_mb": round(peak / 2 ** 20, 2),
+    }
+
+
+def bench_batch(fault, level, images, repeat, config):
+    # Per-image cost of one apply_fault_batch call against looping apply_fault over the same stack
+    def timed(fn):
+        times = []
+        for n in range(repeat + 1):
+            rng = np.random.default_rng(n)
+            start = time.perf_counter()
+            fn(rng)
+            times.append(time.perf_counter() - start)
+        return float(np.median(times[1:])) * 1000 / len(images)
+
+    loop_ms = timed(lambda rng: [apply_fault(image, fault, level, rng=rng, config=config) for image in images])
+    batch_ms = timed(lambda rng: apply_fault_batch(images, fault, level, rng=rng, config=config))
+    return {
+        "ms_per_frame": round(batch_ms, 4),
+        "loop_ms_per_frame": round(loop_ms, 4),
+        "speedup": round(loop_ms / batch_ms, 2),
+    }
+
+
+def run_batch(faults, levels, resolutions, repeat, size, log=print):
+    config = get_config()
+    results = {}
+    for res_name in resolutions:
+        w, h = RESOLUTIONS[res_name]
+        images = np.random.default_rng(0).integers(0, 256, (size, h, w, 3), dtype=np.uint8)
+        for fault in faults:
+            if fault not in BATCH_FUNCTIONS:
+                continue
+            for level in levels:
+                key = f"batch{size}:{fault}/{level}/{res_name}"
+                results[key] = r = bench_batch(fault, level, images, repeat, config)
+                log(f"{key:45s} {r['ms_per_frame']:10.3f} ms/img (loop {r['loop_ms_per_frame']:.3f}) x{r['speedup']:.1f}")
+    return results
+
+
+def run(faults, levels, resolutions, repeat, log=print):
+    config = get_config()
+    results = {}
+    for res_name in resolutions:
+        w, h = RESOLUTIONS[res_name]
+        image = np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8)
+        for fault in faults:
+            for level in levels:
+                key = f"{fault}/{level}/{res_name}"
+                results[key] = bench_fault(fault, level, image, repeat, config)
+                r = results[key]
+                log(f"{key:45s} {r['ms_per_frame']:10.2f} ms {r['mp_per_s']:9.1f} MP/s {r['peak_py_heap_mb']:8.1f} MB py heap")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # A result regresses when it is slower than the baseline by more than ``tolerance`` (a fraction)
+    regressions = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if base and r["ms_per_frame"] > base["ms_per_frame"] * (1 + tolerance):
+            regressions.append((key, base["ms_per_frame"], r["ms_per_frame"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every fault at each level and resolution.")
+    parser.add_argument("--faults", nargs="+", default=list(FAULT_FUNCTIONS), choices=list(FAULT_FUNCTIONS))
+    parser.add_argument("--levels", nargs="+", default=FAULT_LEVELS, choices=FAULT_LEVELS)
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--repeat", type=int, default=15,
+                        help="timed calls per case; the median is reported (default 15)")
+    parser.add_argument("--batch", type=int, default=0, metavar="N",
+                        help="also time apply_fault_batch on N-image stacks against a per-image loop")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a JSON file written by --output")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, as a fraction (default 0.25)")
+    args = parser.parse_args(argv)
+
+    results = run(args.faults, args.levels, args.resolutions, args.repeat)
+    if args.batch:
+        results.update(run_batch(args.faults, args.levels, args.resolutions, args.repeat, args.batch))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "repeat": args.repeat, "results": results}, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: {before:.2f} ms -> {after:.2f} ms (x{after / before:.2f})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
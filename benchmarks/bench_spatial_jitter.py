@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import time
+import numpy as np
+from faults.ai_relevant import spatial_jitter
+
+
+def legacy_spatial_jitter(image, jitter):
+    # Per-pixel loop that spatial_jitter used before it was vectorized, kept as the reference
+    jittered = np.zeros_like(image)
+    for y in range(image.shape[0]):
+        for x in range(image.shape[1]):
+            dy = np.clip(y + np.random.randint(-jitter, jitter + 1), 0, image.shape[0] - 1)
+            dx = np.clip(x + np.random.randint(-jitter, jitter + 1), 0, image.shape[1] - 1)
+            jittered[y, x] = image[dy, dx]
+    return jittered
+
+
+def time_call(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def offset_histogram(jittered, jitter):
+    # Column index is encoded in the red channel, so the difference is the x displacement
+    offsets = jittered[..., 0].astype(int) - np.arange(jittered.shape[1])[None, :]
+    inner = offsets[:, jitter:-jitter]
+    return np.bincount((inner + jitter).ravel(), minlength=2 * jitter + 1) / inner.size
+
+
+def main():
+    jitter = 3
+    ramp = np.zeros((240, 250, 3), dtype=np.uint8)
+    ramp[..., 0] = np.arange(250, dtype=np.uint8)[None, :]
+    print("x-offset frequencies (legacy):    ", np.round(offset_histogram(legacy_spatial_jitter(ramp, jitter), jitter), 3))
+    print("x-offset frequencies (vectorized):", np.round(offset_histogram(spatial_jitter(ramp, "medium"), jitter), 3))
+
+    for w, h, legacy in [(320, 240, True), (640, 480, True), (1920, 1080, False)]:
+        image = np.random.randint(0, 256, (h, w, 3), dtype=np.uint8)
+        new = time_call(lambda: spatial_jitter(image, "medium"), 5)
+        line = f"{w}x{h}: vectorized {new * 1000:8.2f} ms"
+        if legacy:
+            old = time_call(lambda: legacy_spatial_jitter(image, jitter), 1)
+            line += f" | legacy {old * 1000:10.1f} ms | speedup x{old / new:,.0f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+from pathlib import Path
+from core import io
+from core.config import FAULT_CATEGORIES, FAULT_LEVELS
+from core.config_editor import resolve_config
+from faults import apply_fault
+from faults.dispatcher import CHAIN_SEPARATOR, parse_chain
+from faults.rng import new_run_seed, unit_seed
+
+_FAULT_TO_CATEGORY = {fault: category for category, faults in FAULT_CATEGORIES.items() for fault in faults}
+
+
+def fault_pairs(selected_faults):
+    # Accepts the {category: [faults]} mapping used by run_generation, a list of fault names or one name;
+    # "fog+dead_pixels" style names are applied as one chain
+    if isinstance(selected_faults, dict):
+        return [(category, fault) for category, faults in selected_faults.items() for fault in faults]
+    if isinstance(selected_faults, str):
+        selected_faults = [selected_faults]
+    pairs = []
+    for fault in selected_faults:
+        if CHAIN_SEPARATOR in fault:
+            parse_chain(fault)
+            pairs.append(("Chain", fault))
+            continue
+        if fault not in _FAULT_TO_CATEGORY:
+            raise ValueError(f"Fault '{fault}' is not implemented.")
+        pairs.append((_FAULT_TO_CATEGORY[fault], fault))
+    return pairs
+
+
+def _as_rgb(source, index, resize_dims):
+    if isinstance(source, (str, Path)):
+        return io.load_image(source, resize_dims), Path(source).stem
+    image = np.asarray(source)
+    if image.dtype != np.uint8 or image.ndim != 3 or image.shape[2] != 3:
+        raise ValueError(f"Expected an HxWx3 uint8 RGB array, got {image.dtype} array of shape {image.shape}.")
+    if resize_dims:
+        image = cv2.resize(image, tuple(resize_dims))
+    return image, str(index)
+
+
+def iter_faulted(sources, selected_faults, selected_levels=FAULT_LEVELS, resize_dims=None, seed=None, config=None):
+    """Lazily yield ``(rgb_array, metadata)`` for every source x level x fault.
+
+    ``sources`` is any iterable of image paths or HxWx3 uint8 RGB arrays; it is
+    consumed one item at a time and nothing is written to disk. Each output is
+    drawn from its own generator seeded with ``metadata["seed"]``, so passing
+    the same ``seed`` reproduces the stream exactly. The fault config is
+    snapshotted once, so ``config`` (or the file) is fixed for the whole stream.
+    """
+    run_seed = seed if seed is not None else new_run_seed()
+    config = resolve_config(config)
+    pairs = fault_pairs(selected_faults)
+    for index, source in enumerate(sources):
+        image, base_name = _as_rgb(source, index, resize_dims)
+        for level in selected_levels:
+            for category, fault in pairs:
+                output_seed = unit_seed(run_seed, base_name, fault, level)
+                yield apply_fault(image, fault, level, rng=np.random.default_rng(output_seed), config=config), {
+                    "base_name": base_name,
+                    "source_index": index,
+                    "level": level,
+                    "type": fault,
+                    "category": category,
+                    "seed": output_seed,
+                    "config_snapshot": config.hash
+                }
@@ -0,0 +1,98 @@
+import json
+import sqlite3
+from pathlib import Path
+
+CATALOG_NAME = "catalog.sqlite"
+
+COLUMNS = ("path", "filename", "base_name", "input_path", "input_hash", "fault", "category", "level",
+           "seed", "config_hash", "config_snapshot", "size_bytes", "timings_ms", "timestamp")
+
+# Columns that select() accepts as keyword filters
+FILTERS = ("base_name", "input_hash", "fault", "category", "level", "seed", "config_hash", "config_snapshot")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    path TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    base_name TEXT,
+    input_path TEXT,
+    input_hash TEXT,
+    fault TEXT NOT NULL,
+    category TEXT,
+    level TEXT,
+    seed INTEGER,
+    config_hash TEXT,
+    config_snapshot TEXT,
+    size_bytes INTEGER,
+    timings_ms TEXT,
+    timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS outputs_fault_level ON outputs (fault, level);
+CREATE INDEX IF NOT EXISTS outputs_category_level ON outputs (category, level);
+CREATE INDEX IF NOT EXISTS outputs_base_name ON outputs (base_name);
+CREATE INDEX IF NOT EXISTS outputs_input_hash ON outputs (input_hash);
+"""
+
+
+class Catalog:
+    """Indexed SQLite table of generated outputs, one row per output file.
+
+    ``select(category="Hardware", level="extreme", input_glob="*/cam_x/*")``
+    returns matching rows as dicts; every filter in ``FILTERS`` also accepts a
+    list of values.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_SCHEMA)
+
+    def record(self, rows):
+        # Re-running an output replaces its row
+        self.db.executemany(
+            f"INSERT OR REPLACE INTO outputs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            [tuple(json.dumps(row.get(c)) if c == "timings_ms" and row.get(c) is not None else row.get(c)
+                   for c in COLUMNS) for row in rows])
+        self.db.commit()
+
+    def _where(self, filters, input_glob):
+        clauses, params = [], []
+        for column, value in filters.items():
+            if column not in FILTERS:
+                raise ValueError(f"Cannot filter on '{column}'; use one of {', '.join(FILTERS)}.")
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if input_glob:
+            clauses.append("input_path GLOB ?")
+            params.append(input_glob)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def select(self, input_glob=None, limit=None, **filters):
+        where, params = self._where(filters, input_glob)
+        sql = f"SELECT * FROM outputs{where} ORDER BY path"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        rows = []
+        for row in self.db.execute(sql, params):
+            row = dict(row)
+            if row["timings_ms"] is not None:
+                row["timings_ms"] = json.loads(row["timings_ms"])
+            rows.append(row)
+        return rows
+
+    def paths(self, input_glob=None, **filters):
+        where, params = self._where(filters, input_glob)
+        return [Path(row[0]) for row in self.db.execute(f"SELECT path FROM outputs{where} ORDER BY path", params)]
+
+    def count(self, input_glob=None, **filters):
+        where, params = self._where(filters, input_glob)
+        return self.db.execute(f"SELECT COUNT(*) FROM outputs{where}", params).fetchone()[0]
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,194 @@
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from core import io
+from core.api import fault_pairs
+from core.config import FAULT_CATEGORIES, FAULT_LEVELS
+from core.processing import HeadlessApp, run_generation
+from core.decode_cache import DecodeCache
+from core.video import VIDEO_EXTENSIONS, is_stream, process_streams, stream_name
+from faults.dispatcher import parse_chain
+
+JOB_DEFAULTS = {
+    "faults": FAULT_CATEGORIES,
+    "levels": FAULT_LEVELS,
+    "resize": None,
+    "engine": "parallel",
+    "workers": None,
+    "seed": None,
+    "incremental": True,
+    "export": ["json", "csv"],
+    "timings": False,
+    "trace": None,
+    "decode_cache": None,
+    "decode_cache_max_mb": 4096,
+    "recursive": False,
+    "index": None,
+    "catalog": None,
+    "sequence": False,
+    "video_output": ".mp4",
+    "fps": None,
+}
+
+EXPORT_FORMATS = ("json", "csv")
+STREAM_SUMMARY_NAME = "stream_summary.json"
+
+
+class JobError(ValueError):
+    pass
+
+
+def _is_positive_int(value):
+    # bool is an int subclass, but "workers": true is a mistake
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def load_job(path):
+    """Read a JSON job file and fill in defaults for every optional key.
+
+    ``input`` and ``output`` are resolved relative to the job file. ``faults``
+    is either the ``{category: [faults]}`` mapping the GUI produces or a list of
+    fault names (``"fog+dead_pixels"`` chains included). An ``input`` that is a
+    video file or a ``frames/%05d.png`` sequence makes it a stream job, and so
+    does ``"sequence": true`` for a folder of numbered frames.
+    """
+    path = Path(path)
+    try:
+        with path.open("r") as f:
+            job = {**JOB_DEFAULTS, **json.load(f)}
+    except (OSError, ValueError) as e:
+        raise JobError(f"Could not read job file '{path}': {e}")
+
+    for key in ("input", "output"):
+        if not job.get(key):
+            raise JobError(f"Job file is missing '{key}'.")
+        job[key] = path.parent / job[key]
+    for key in ("trace", "decode_cache", "index", "catalog"):
+        if job[key]:
+            job[key] = path.parent / job[key]
+    # A folder of numbered frames looks like an image folder, so it is only a stream when asked for
+    job["stream"] = bool(job["sequence"]) or is_stream(job["input"])
+    if job["stream"]:
+        source = Path(job["input"])
+        if not (source.is_dir() or source.is_file() or ("%" in source.name and source.parent.is_dir())):
+            raise JobError(f"Input stream '{job['input']}' does not exist.")
+        if job["video_output"] != "frames" and job["video_output"] not in VIDEO_EXTENSIONS:
+            raise JobError(f"Unknown video output '{job['video_output']}'; use 'frames' or one of "
+                           f"{', '.join(VIDEO_EXTENSIONS)}.")
+    elif not Path(job["input"]).is_dir():
+        raise JobError(f"Input folder '{job['input']}' does not exist.")
+
+    try:
+        pairs = fault_pairs(job["faults"])
+        for _, fault in pairs:
+            parse_chain(fault)
+    except ValueError as e:
+        raise JobError(str(e))
+    job["faults"] = {}
+    for category, fault in pairs:
+        job["faults"].setdefault(category, []).append(fault)
+
+    unknown = [level for level in job["levels"] if level not in FAULT_LEVELS]
+    if unknown:
+        raise JobError(f"Unknown levels: {', '.join(unknown)}.")
+    resize = job["resize"]
+    if resize is not None and (not isinstance(resize, list) or len(resize) != 2
+                               or not all(_is_positive_int(side) for side in resize)):
+        raise JobError(f"'resize' must be [width, height] in pixels, got {resize!r}.")
+    if job["workers"] is not None and not _is_positive_int(job["workers"]):
+        raise JobError(f"'workers' must be a positive integer, got {job['workers']!r}.")
+    if job["engine"] not in ("serial", "parallel", "pipeline"):
+        raise JobError(f"Unknown engine '{job['engine']}'.")
+    unknown = [fmt for fmt in job["export"] if fmt not in EXPORT_FORMATS]
+    if unknown:
+        raise JobError(f"Unknown export formats: {', '.join(unknown)}.")
+    if not job["faults"] or not job["levels"]:
+        raise JobError("Select at least one fault and one level.")
+    return job
+
+
+def run_stream_job(job, log_callback=None):
+    """Write one faulted copy of the input stream per level x fault, decoding the input once."""
+    output = Path(job["output"])
+    base_name = stream_name(job["input"])
+    suffix = "" if job["video_output"] == "frames" else job["video_output"]
+    branches = [(output / f"{base_name}_{fault}_{level}{suffix}", fault, level)
+                for level in job["levels"] for faults in job["faults"].values() for fault in faults]
+    start = time.perf_counter()
+    streams = process_streams(job["input"], branches, resize_dims=job["resize"], seed=job["seed"], fps=job["fps"],
+                              workers=job["workers"])
+    if log_callback:
+        for summary in streams:
+            log_callback(f"{summary['type']}/{summary['level']}: {summary['frames']} frames "
+                         f"at {summary['processed_fps']} fps")
+    with (output / STREAM_SUMMARY_NAME).open("w") as f:
+        json.dump(streams, f, indent=4)
+    elapsed = time.perf_counter() - start
+
+    frames = sum(summary["frames"] for summary in streams)
+    return {
+        "status": "ok",
+        "streams": len(streams),
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "frames_per_second": round(frames / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def run_job(job, log_callback=None):
+    """Run one job and return its throughput stats."""
+    if job["stream"]:
+        return run_stream_job(job, log_callback)
+    app = HeadlessApp(job["input"])
+    decode_cache = None
+    if job["decode_cache"]:
+        decode_cache = DecodeCache(job["decode_cache"], max_bytes=int(job["decode_cache_max_mb"] * 2 ** 20))
+    start = time.perf_counter()
+    summary = run_generation(app, job["levels"], job["faults"], job["output"],
+                             log_callback=log_callback, resize_dims=job["resize"],
+                             parallel=job["engine"] == "parallel", pipeline=job["engine"] == "pipeline",
+                             workers=job["workers"], incremental=job["incremental"], seed=job["seed"],
+                             timings=job["timings"], trace_path=job["trace"], decode_cache=decode_cache,
+                             recursive=job["recursive"], index_path=job["index"], catalog=job["catalog"])
+    run_stats = summary.run_stats
+    stage_timings = run_stats["stage_timings"]
+    io.finalize_metadata(job["output"], formats=job["export"], stage_timings=stage_timings)
+    elapsed = time.perf_counter() - start
+
+    outputs = run_stats["outputs"]
+    stats = {
+        "status": "ok",
+        "images": run_stats["images"],
+        "outputs": outputs,
+        "skipped": run_stats["skipped"],
+        "seconds": round(elapsed, 3),
+        "outputs_per_second": round(outputs / elapsed, 2) if elapsed > 0 else None,
+    }
+    if stage_timings is not None:
+        stats["stage_timings"] = stage_timings
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a fault injection job without the GUI.")
+    parser.add_argument("job", help="path to a JSON job file")
+    parser.add_argument("-q", "--quiet", action="store_true", help="don't log progress to stderr")
+    args = parser.parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    # stdout carries only the final stats line so it can be parsed by the caller
+    try:
+        job = load_job(args.job)
+        stats = run_job(job, log_callback=None if args.quiet else log)
+    except JobError as e:
+        print(json.dumps({"status": "error", "error": str(e)}))
+        return 2
+    except Exception as e:
+        print(json.dumps({"status": "error", "error": f"{type(e).__name__}: {e}"}))
+        return 1
+    print(json.dumps(stats))
+    return 0
@@ -52,13 +52,13 @@ FAULT_DESCRIPTIONS = {
 
     # Hardware
     "blackout": "Complete or partial frame loss",
-    "frame_drop": "Simulates dropped or skipped frames",
+    "frame_drop": "Dims stills; repeats the last frame in bursts on video streams",
     "dead_pixels": "Black (stuck-off) sensor pixels",
     "hot_pixels": "Bright (stuck-on) sensor pixels",
     "line_dropout": "Row/column failures from sensor readout issues",
 
     # AI-Relevant
-    "temporal_lag": "Repeats old frame (TODO: needs sequence memory)",
+    "temporal_lag": "Shows an older frame of a video stream (still images pass through)",
     "spatial_jitter": "Pixel-level noise or motion shake",
     "random_patch_noise": "Random occlusion patches",
     "warping": "Perspective or lens-induced distortion"
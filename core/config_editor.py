@@ -1,8 +1,13 @@
 
 import json
+import hashlib
 from pathlib import Path
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
 
-CONFIG_PATH = Path("fault_level_config.json")
+# Resolved next to the package so the file is found regardless of the working directory
+CONFIG_PATH = Path(__file__).resolve().parent.parent / "fault_level_config.json"
 
 DEFAULTS = {
     "flicker": {"low": 8, "medium": 20, "extreme": 32},
@@ -30,3 +35,64 @@ def save_config(data):
 
 def reset_to_defaults():
     save_config(DEFAULTS.copy())
+
+
+class ConfigSnapshot(Mapping):
+    """Read-only view of one version of the fault config, identified by ``hash``."""
+
+    def __init__(self, data, version=None):
+        self._data = json.loads(json.dumps(data))
+        self.version = version
+        self.hash = hashlib.sha256(json.dumps(self._data, sort_keys=True).encode()).hexdigest()[:16]
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        return MappingProxyType(value) if isinstance(value, dict) else value
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def to_dict(self):
+        return json.loads(json.dumps(self._data))
+
+
+_snapshot = None
+
+
+def get_config():
+    # Re-read the file only when its mtime or size changed since the last snapshot
+    global _snapshot
+    try:
+        stat = CONFIG_PATH.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        version = None
+    if _snapshot is None or _snapshot.version != version:
+        _snapshot = ConfigSnapshot(load_config(), version=version)
+    return _snapshot
+
+
+# Snapshots of the last few plain dicts passed in, keyed by id; the dict is kept so its id can't be reused
+_wrapped = OrderedDict()
+_WRAPPED_SIZE = 8
+
+
+def resolve_config(config=None):
+    # Plain dicts passed by callers are frozen so every fault sees the same values
+    if config is None:
+        return get_config()
+    if isinstance(config, ConfigSnapshot):
+        return config
+    cached = _wrapped.get(id(config))
+    # A dict edited in place since it was wrapped no longer compares equal and is wrapped again
+    if cached is not None and cached[0] is config and cached[1]._data == config:
+        _wrapped.move_to_end(id(config))
+        return cached[1]
+    snapshot = ConfigSnapshot(config)
+    _wrapped[id(config)] = (config, snapshot)
+    if len(_wrapped) > _WRAPPED_SIZE:
+        _wrapped.popitem(last=False)
+    return snapshot
@@ -0,0 +1,104 @@
+import os
+import numpy as np
+from pathlib import Path
+from core import io
+from core.manifest import file_hash
+from core.timing import clock, lap
+
+
+class DecodeCache:
+    """On-disk cache of decoded, resized RGB inputs stored as ``.npy`` files.
+
+    Entries are keyed by the source's content hash and ``resize_dims`` and are
+    memory-mapped on a hit instead of being decoded again. When the cache grows
+    past ``max_bytes`` the least recently used entries are removed.
+    """
+
+    def __init__(self, path, max_bytes=4 << 30):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hashes = {}
+        self._size = None
+
+    def __reduce__(self):
+        # Pool workers get the location and budget only and reuse one cache per process, so the
+        # size count survives across tasks; each unit brings its input's hash instead
+        return _shared_cache, (self.path, self.max_bytes)
+
+    def key(self, img_path, resize_dims=None, digest=None):
+        digest = digest or self.hashes.get(str(img_path))
+        if digest is None:
+            digest = self.hashes[str(img_path)] = file_hash(img_path)
+        dims = "x".join(str(d) for d in resize_dims) if resize_dims else "full"
+        return f"{digest[:32]}_{dims}"
+
+    def load(self, img_path, resize_dims=None, timer=None, digest=None):
+        """Return the RGB input, memory-mapped on a hit; on a miss it is decoded and stored.
+
+        ``digest`` is the input's content hash when the caller already knows it.
+        """
+        entry = self.path / f"{self.key(img_path, resize_dims, digest)}.npy"
+        start = clock(timer)
+        try:
+            img_rgb = np.asarray(np.load(entry, mmap_mode="r"))
+            # The entry's mtime is its last use, which is what eviction orders by
+            os.utime(entry)
+            lap(timer, "decode", start)
+            if timer is not None:
+                timer.skip("resize")
+            return img_rgb
+        except (OSError, ValueError):
+            pass
+        img_rgb = io.read_image(img_path)
+        start = lap(timer, "decode", start)
+        img_rgb = io.resize_image(img_rgb, resize_dims)
+        lap(timer, "resize", start)
+        self._store(entry, img_rgb)
+        return img_rgb
+
+    def _store(self, entry, img_rgb):
+        tmp_path = entry.with_name(f"{entry.stem}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, img_rgb)
+        os.replace(tmp_path, entry)
+        # The directory is only scanned on the first store and when over budget
+        if self._size is None:
+            self.evict()
+            return
+        self._size += entry.stat().st_size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        with os.scandir(self.path) as it:
+            return [Path(e.path) for e in it if e.name.endswith(".npy") and ".tmp." not in e.name]
+
+    def evict(self):
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                entry.unlink()
+            except OSError:
+                # Already removed by another worker, or still mapped on platforms that forbid it
+                continue
+            self._size -= size
+
+
+_shared = {}
+
+
+def _shared_cache(path, max_bytes):
+    key = (str(path), max_bytes)
+    if key not in _shared:
+        _shared[key] = DecodeCache(path, max_bytes)
+    return _shared[key]
@@ -1,27 +1,225 @@
 from pathlib import Path
+import os
 import json
 import csv
+import sqlite3
+import cv2
 
-def list_images(input_folder):
-    input_path = Path(input_folder)
-    return list(input_path.glob("*.jpg")) + list(input_path.glob("*.jpeg")) + \
-           list(input_path.glob("*.png")) + list(input_path.glob("*.webp"))
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+METADATA_LOG_NAME = "run_metadata.jsonl"
+METADATA_CSV_NAME = "run_metadata.csv"
+STAGE_TIMINGS_NAME = "stage_timings.json"
+
+def _scan(folder, recursive):
+    # One scandir pass per directory; entries are yielded in the order the filesystem returns
+    # them, so the first path is available before a large folder has been read to the end
+    stack = [folder]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                    yield Path(entry.path)
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+
+def _index_header(folder, recursive):
+    return f"# image index: {Path(folder).resolve()} recursive={recursive}\n"
+
+def iter_images(input_folder, recursive=False, index_path=None, refresh=False):
+    """Yield image paths under ``input_folder`` as they are found.
+
+    Extensions are matched case-insensitively. With ``index_path`` the listing
+    is also written there, and later calls read that file instead of walking
+    the tree until ``refresh`` is set.
+    """
+    header = _index_header(input_folder, recursive)
+    if index_path and not refresh and Path(index_path).exists():
+        with open(index_path, "r") as f:
+            if f.readline() == header:
+                for line in f:
+                    yield Path(input_folder) / line.rstrip("\n")
+                return
+
+    if not index_path:
+        yield from _scan(input_folder, recursive)
+        return
+    # Written to a temp file so an interrupted walk never leaves a partial index behind
+    tmp_path = Path(index_path).with_suffix(".tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(header)
+            for path in _scan(input_folder, recursive):
+                f.write(f"{path.relative_to(input_folder).as_posix()}\n")
+                yield path
+        os.replace(tmp_path, index_path)
+    finally:
+        # Also runs when the caller closes the generator before the walk ends
+        tmp_path.unlink(missing_ok=True)
+
+def list_images(input_folder, recursive=False, index_path=None, refresh=False):
+    return list(iter_images(input_folder, recursive, index_path, refresh))
+
+def read_image(image_path):
+    img = cv2.imread(str(image_path))
+    if img is None:
+        raise ValueError(f"Could not read image '{image_path}'.")
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+def resize_image(img_rgb, resize_dims=None):
+    if resize_dims:
+        img_rgb = cv2.resize(img_rgb, tuple(resize_dims))
+    return img_rgb
+
+def load_image(image_path, resize_dims=None):
+    return resize_image(read_image(image_path), resize_dims)
+
+def encode_image(img_rgb, ext=".jpg"):
+    _, buffer = cv2.imencode(ext, cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR))
+    return buffer
+
+def _indented(value, depth):
+    return json.dumps(value, indent=4).replace("\n", "\n" + "    " * depth)
+
+def _write_json_list(f, entries, depth):
+    # Streams the same text json.dump(list(entries), indent=4) would produce at this depth
+    pad = "    " * (depth + 1)
+    first = True
+    for entry in entries:
+        f.write(("[\n" if first else ",\n") + pad + _indented(entry, depth + 1))
+        first = False
+    f.write("[]" if first else "\n" + "    " * depth + "]")
 
 def save_metadata_json(output_path, data, filename="global_metadata_summary.json"):
+    # ``data`` may be any iterable of entries, e.g. a MetadataLog, and is written without
+    # being loaded into memory
+    with open(Path(output_path) / filename, 'w') as f:
+        _write_json_list(f, data, 0)
+
+def save_stage_timings(output_path, stage_timings, filename=STAGE_TIMINGS_NAME):
     with open(Path(output_path) / filename, 'w') as f:
-        json.dump(data, f, indent=4)
+        json.dump(stage_timings, f, indent=4)
+
+CSV_HEADER = ["base_name", "level", "timestamp", "filename", "fault_name", "category", "seed", "config_snapshot"]
+
+def _csv_rows(entry):
+    for fault in entry["faults"]:
+        yield [
+            entry["base_name"],
+            entry["level"],
+            entry["timestamp"],
+            fault["filename"],
+            fault["type"],
+            fault.get("category", "unknown"),
+            fault.get("seed", ""),
+            fault.get("config_snapshot", "")
+        ]
 
 def save_metadata_csv(output_path, data, filename="global_metadata_summary.csv"):
     with open(Path(output_path) / filename, 'w', newline='') as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(["base_name", "level", "timestamp", "filename", "fault_name", "category"])
+        writer.writerow(CSV_HEADER)
         for entry in data:
-            for fault in entry["faults"]:
-                writer.writerow([
-                    entry["base_name"],
-                    entry["level"],
-                    entry["timestamp"],
-                    fault["filename"],
-                    fault["type"],
-                    fault.get("category", "unknown")
-                ])
+            writer.writerows(_csv_rows(entry))
+
+def _trim_partial_line(path, chunk_size=1 << 16):
+    # A crash can leave the last line incomplete; it is cut off so appended lines start clean.
+    # Returns the remaining size in bytes.
+    try:
+        f = open(path, "rb+")
+    except FileNotFoundError:
+        return 0
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(end - chunk_size, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end != size:
+            f.truncate(end)
+        return end
+
+
+class MetadataLog:
+    """Append-only JSONL log of summary entries, flushed as each entry completes.
+
+    A run writing to the log keeps no summary in memory and leaves usable
+    metadata behind if it stops early. With ``csv_path`` the same entries are
+    also streamed as CSV rows. Runs append to what earlier runs wrote, and a
+    later entry for the same ``(base_name, level)`` replaces an earlier one:
+    iterating the log re-reads it from disk and yields only the latest entry
+    of each, so it can be passed wherever a summary list is accepted.
+    ``run_stats`` holds the counts and stage timings of the last run that wrote it.
+    """
+
+    def __init__(self, path, csv_path=None):
+        self.path = Path(path)
+        self.csv_path = Path(csv_path) if csv_path else None
+        self.file = None
+        self.csv_file = None
+        self.is_new = None
+        self.run_stats = None
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # True when no earlier run left entries behind
+        self.is_new = _trim_partial_line(self.path) == 0
+        self.file = open(self.path, "a")
+        if self.csv_path:
+            new_csv = _trim_partial_line(self.csv_path) == 0
+            self.csv_file = open(self.csv_path, "a", newline="")
+            self.csv_writer = csv.writer(self.csv_file)
+            if new_csv:
+                self.csv_writer.writerow(CSV_HEADER)
+        return self
+
+    def append(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        if self.csv_file:
+            self.csv_writer.writerows(_csv_rows(entry))
+            self.csv_file.flush()
+
+    def close(self):
+        for f in (self.file, self.csv_file):
+            if f:
+                f.close()
+        self.file = self.csv_file = None
+
+    def _entries(self):
+        with open(self.path, "r") as f:
+            for number, line in enumerate(f):
+                # A crash can leave the last line incomplete
+                if not line.endswith("\n"):
+                    break
+                entry = json.loads(line)
+                yield number, f"{entry['base_name']}\0{entry['level']}", entry
+
+    def __iter__(self):
+        # The line of each key's latest entry is indexed in a temporary on-disk
+        # SQLite database, so memory stays flat however long the log is
+        index = sqlite3.connect("")
+        try:
+            index.execute("CREATE TABLE latest (key TEXT PRIMARY KEY, line INTEGER)")
+            index.executemany("INSERT OR REPLACE INTO latest VALUES (?, ?)",
+                              ((key, number) for number, key, _ in self._entries()))
+            for number, key, entry in self._entries():
+                if index.execute("SELECT line FROM latest WHERE key = ?", (key,)).fetchone()[0] == number:
+                    yield entry
+        finally:
+            index.close()
+
+def finalize_metadata(output_path, log_path=None, formats=("json", "csv"), stage_timings=None):
+    """Write the regular summary files from a metadata log, e.g. after an interrupted run."""
+    log = MetadataLog(log_path or Path(output_path) / METADATA_LOG_NAME)
+    if "json" in formats:
+        save_metadata_json(output_path, log)
+    if "csv" in formats:
+        save_metadata_csv(output_path, log)
+    if stage_timings is not None:
+        save_stage_timings(output_path, stage_timings)
@@ -0,0 +1,124 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+MANIFEST_NAME = "run_manifest.sqlite"
+# Manifests written by earlier versions are imported once
+LEGACY_MANIFEST_NAME = "run_manifest.json"
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def config_hash(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inputs (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT);
+CREATE TABLE IF NOT EXISTS outputs (
+    filename TEXT PRIMARY KEY,
+    input_hash TEXT,
+    fault TEXT,
+    level TEXT,
+    config_hash TEXT,
+    seed INTEGER,
+    config_snapshot TEXT
+);
+"""
+
+OUTPUT_FIELDS = ("input_hash", "fault", "level", "config_hash", "seed", "config_snapshot")
+
+
+class RunManifest:
+    """Output manifest keyed by input content hash, fault, level and config hash.
+
+    Entries live in a SQLite file next to the outputs. ``record`` only queues a
+    change and ``save`` writes the changes queued since the previous save, so
+    periodic saves cost the same at any manifest size. A pipeline run plans
+    units on its feeder thread while results are recorded on the caller's, so
+    every method holds the manifest's lock.
+    """
+
+    def __init__(self, output_path):
+        self.path = Path(output_path) / MANIFEST_NAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.lock = threading.RLock()
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_SCHEMA)
+        self.changed_inputs = {}
+        self.changed_outputs = {}
+        self._import_legacy()
+
+    def _import_legacy(self):
+        legacy = self.path.parent / LEGACY_MANIFEST_NAME
+        if not legacy.exists():
+            return
+        try:
+            with legacy.open("r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for path, entry in data.get("inputs", {}).items():
+            self.changed_inputs[path] = entry
+        for filename, entry in data.get("outputs", {}).items():
+            self.changed_outputs[filename] = entry
+        self.save()
+        legacy.unlink()
+
+    def input_hash(self, img_path):
+        # Re-hash only when size or mtime changed so unchanged trees are checked quickly
+        stat = os.stat(img_path)
+        with self.lock:
+            cached = self.changed_inputs.get(str(img_path))
+            if cached is None:
+                cached = self.db.execute("SELECT size, mtime, hash FROM inputs WHERE path = ?",
+                                         (str(img_path),)).fetchone()
+        if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime:
+            return cached["hash"]
+        digest = file_hash(img_path)
+        with self.lock:
+            self.changed_inputs[str(img_path)] = {"size": stat.st_size, "mtime": stat.st_mtime, "hash": digest}
+        return digest
+
+    def recorded(self, filename):
+        with self.lock:
+            if filename in self.changed_outputs:
+                return self.changed_outputs[filename]
+            row = self.db.execute("SELECT * FROM outputs WHERE filename = ?", (filename,)).fetchone()
+        return dict(row) if row else None
+
+    def is_current(self, filename, entry):
+        recorded = self.recorded(filename)
+        if recorded is None or any(recorded.get(key) != value for key, value in entry.items()):
+            return False
+        return (self.path.parent / filename).exists()
+
+    def record(self, filename, entry):
+        with self.lock:
+            self.changed_outputs[filename] = entry
+
+    def save(self):
+        with self.lock:
+            self.db.executemany("INSERT OR REPLACE INTO inputs VALUES (?, ?, ?, ?)",
+                                [(path, e["size"], e["mtime"], e["hash"]) for path, e in self.changed_inputs.items()])
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO outputs VALUES ({', '.join('?' * (len(OUTPUT_FIELDS) + 1))})",
+                [(filename, *(e.get(field) for field in OUTPUT_FIELDS)) for filename, e in self.changed_outputs.items()])
+            self.db.commit()
+            self.changed_inputs = {}
+            self.changed_outputs = {}
+
+    def close(self):
+        with self.lock:
+            self.save()
+            self.db.close()
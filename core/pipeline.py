@@ -0,0 +1,114 @@
+import queue
+import threading
+
+_DONE = object()
+
+
+class StagedPipeline:
+    """Thread pipeline where each stage has its own workers and a bounded input queue.
+
+    ``stages`` is a list of ``(name, fn, workers)``; ``fn(item)`` returns an
+    iterable of items handed to the next stage. Items coming out of the last
+    stage are yielded by ``run``.
+    """
+
+    def __init__(self, stages, queue_size=8):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.output = queue.Queue(maxsize=queue_size)
+        self.stop = threading.Event()
+        self.errors = []
+        self._depth_max = {name: 0 for name, _, _ in stages}
+        self._depth_sum = {name: 0 for name, _, _ in stages}
+        self._samples = 0
+
+    def depths(self):
+        # Depth of each stage's input queue; a queue that stays full points at a slow stage
+        return {name: q.qsize() for (name, _, _), q in zip(self.stages, self.queues)}
+
+    def stats(self):
+        samples = max(self._samples, 1)
+        return {name: {"max": self._depth_max[name], "mean": round(self._depth_sum[name] / samples, 2)}
+                for name, _, _ in self.stages}
+
+    def run(self, source):
+        threads = [threading.Thread(target=self._feed, args=(source,), name="feed", daemon=True)]
+        for i, (name, fn, workers) in enumerate(self.stages):
+            out_q = self.queues[i + 1] if i + 1 < len(self.stages) else self.output
+            remaining = [workers]
+            lock = threading.Lock()
+            for n in range(workers):
+                threads.append(threading.Thread(target=self._work, args=(fn, self.queues[i], out_q, remaining, lock),
+                                                name=f"{name}-{n}", daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(self.output)
+                if item is _DONE:
+                    break
+                self._sample()
+                yield item
+        finally:
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+        if self.errors:
+            raise self.errors[0]
+
+    def _sample(self):
+        self._samples += 1
+        for name, depth in self.depths().items():
+            self._depth_sum[name] += depth
+            self._depth_max[name] = max(self._depth_max[name], depth)
+
+    def _get(self, q):
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _put(self, q, item):
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed(self, source):
+        try:
+            for item in source:
+                if not self._put(self.queues[0], item):
+                    return
+        except Exception as exc:
+            self.errors.append(exc)
+            self.stop.set()
+            return
+        self._put(self.queues[0], _DONE)
+
+    def _work(self, fn, in_q, out_q, remaining, lock):
+        try:
+            while True:
+                item = self._get(in_q)
+                if item is _DONE:
+                    break
+                for out in fn(item):
+                    if not self._put(out_q, out):
+                        return
+        except Exception as exc:
+            self.errors.append(exc)
+            self.stop.set()
+            return
+
+        # Hand the end marker to sibling workers; the last one forwards it downstream
+        self._put(in_q, _DONE)
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            self._put(out_q, _DONE)
@@ -1,60 +1,472 @@
+import os
 import time
-import cv2
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from datetime import datetime
 from core import io
+from core.pipeline import StagedPipeline
+from core.timing import StageTimings, UnitTimer, TRACE_KEY, clock, lap
+from core.trace import TraceWriter
+from core.decode_cache import DecodeCache
+from core.manifest import RunManifest, config_hash, file_hash
+from core.catalog import Catalog
+from core.config_editor import get_config
 from faults import apply_fault
+from faults.dispatcher import CHAIN_SEPARATOR
+from faults.rng import new_run_seed, unit_seed
 from core.config import FAULT_CATEGORIES
 
+# Last decoded input per process; the serial engine walks units image-major and
+# the parallel engine sends each image's units to one worker as a single task.
+_image_cache = {}
+
+
+def _plan_units(image_files, selected_levels, selected_faults, run_seed):
+    # Each unit carries its own seed so any output can be regenerated bit-exactly
+    return ((img_path, level, category, fault, unit_seed(run_seed, Path(img_path).stem, fault, level))
+            for img_path in image_files
+            for level in selected_levels
+            for category, faults in selected_faults.items()
+            for fault in faults)
+
+
+def _fault_config(config_data, fault):
+    # Chains ("fog+dead_pixels") depend on the settings of every fault in them
+    if CHAIN_SEPARATOR in fault:
+        return [config_data.get(name) for name in fault.split(CHAIN_SEPARATOR)]
+    return config_data.get(fault)
+
+
+def _decode(img_path, resize_dims, timer=None, decode_cache=None, input_hash=None):
+    if decode_cache is not None:
+        return decode_cache.load(img_path, resize_dims, timer, input_hash)
+    start = clock(timer)
+    img_rgb = io.read_image(img_path)
+    start = lap(timer, "decode", start)
+    img_rgb = io.resize_image(img_rgb, resize_dims)
+    lap(timer, "resize", start)
+    return img_rgb
+
+
+def _load_image(img_path, resize_dims, timer=None, decode_cache=None, input_hash=None):
+    key = (str(img_path), resize_dims)
+    if key not in _image_cache:
+        _image_cache.clear()
+        _image_cache[key] = _decode(img_path, resize_dims, timer, decode_cache, input_hash)
+    elif timer is not None:
+        timer.skip("decode", "resize")
+    return _image_cache[key]
+
+
+def _fault_metadata(unit, config):
+    img_path, level, category, fault, seed = unit
+    return {
+        "filename": f"{Path(img_path).stem}_{fault}_{category}_{level}.jpg",
+        "type": fault,
+        "category": category,
+        "seed": seed,
+        "config_snapshot": config.hash
+    }
+
+
+def _process_unit(unit, output_path, resize_dims, config, instrument=None, decode_cache=None, input_hash=None):
+    img_path, level, category, fault, seed = unit
+    timer = UnitTimer(**instrument) if instrument else None
+    img_rgb = _load_image(img_path, resize_dims, timer, decode_cache, input_hash)
+    start = clock(timer)
+    result = apply_fault(img_rgb, fault, level, rng=np.random.default_rng(seed), config=config)
+    start = lap(timer, "fault", start)
+    buffer = io.encode_image(result)
+    start = lap(timer, "encode", start)
+    metadata = _fault_metadata(unit, config)
+    buffer.tofile(str(Path(output_path) / metadata["filename"]))
+    lap(timer, "write", start)
+    return timer.attach(metadata) if timer else metadata
+
+
+def _catalog_row(unit, fault_metadata, output_root, entry):
+    img_path, level, category, fault, _ = unit
+    path = output_root / fault_metadata["filename"]
+    try:
+        size = path.stat().st_size
+    except OSError:
+        size = None
+    return {
+        "path": str(path),
+        "filename": fault_metadata["filename"],
+        "base_name": Path(img_path).stem,
+        "input_path": str(img_path),
+        "input_hash": entry["input_hash"],
+        "fault": fault,
+        "category": category,
+        "level": level,
+        "seed": fault_metadata["seed"],
+        "config_hash": entry["config_hash"],
+        "config_snapshot": fault_metadata["config_snapshot"],
+        "size_bytes": size,
+        "timings_ms": fault_metadata.get("timings_ms"),
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+# Work items are (index, unit, input_hash, done); ``done`` is the recorded metadata of an
+# up-to-date output, which engines hand back without redoing the unit
+
+def _run_serial(work, output_path, resize_dims, config, cancel_flag, instrument, decode_cache):
+    for index, unit, input_hash, done in work:
+        if cancel_flag[0]:
+            break
+        if done is not None:
+            yield index, done
+            continue
+        yield index, _process_unit(unit, output_path, resize_dims, config, instrument, decode_cache, input_hash)
+
+
+def _process_group(group, output_path, resize_dims, config, instrument=None, decode_cache=None):
+    return [(index, _process_unit(unit, output_path, resize_dims, config, instrument, decode_cache, input_hash))
+            for index, unit, input_hash in group]
+
+
+def _run_parallel(work, output_path, resize_dims, config, cancel_flag, instrument, decode_cache, workers):
+    # One task per input image so it is decoded once, not once per worker; keep a
+    # bounded number of tasks in flight so huge runs don't queue everything up front.
+    groups = itertools.groupby(work, key=lambda item: item[1][0])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+        while True:
+            for _, items in groups:
+                group = []
+                for index, unit, input_hash, done in items:
+                    if done is not None:
+                        yield index, done
+                    else:
+                        # Workers don't get the decode cache's hash memo, so each unit carries its input's hash
+                        group.append((index, unit, input_hash))
+                if group:
+                    in_flight[executor.submit(_process_group, group, output_path, resize_dims, config,
+                                              instrument, decode_cache)] = len(group)
+                if len(in_flight) >= workers * 2 or cancel_flag[0]:
+                    break
+            if not in_flight or cancel_flag[0]:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                del in_flight[future]
+                yield from future.result()
+        for future in in_flight:
+            future.cancel()
+
+
+def _run_pipeline(work, output_path, resize_dims, config, cancel_flag, instrument, decode_cache, stage_workers,
+                  queue_size, log_callback, stats_callback):
+    def source():
+        for img_path, group in itertools.groupby(work, key=lambda item: item[1][0]):
+            if cancel_flag[0]:
+                return
+            yield img_path, list(group)
+
+    # Up-to-date outputs ride through the later stages as (index, None, metadata, None)
+    def decode(item):
+        img_path, group = item
+        for index, _, _, done in group:
+            if done is not None:
+                yield index, None, done, None
+        group = [(index, unit, input_hash) for index, unit, input_hash, done in group if done is None]
+        if not group:
+            return
+        timer = UnitTimer(**instrument) if instrument else None
+        img_rgb = _decode(img_path, resize_dims, timer, decode_cache, group[0][2])
+        for n, (index, unit, _) in enumerate(group):
+            # One decode serves every unit of the image, so only the first is charged for it
+            if timer and n > 0:
+                timer = UnitTimer(**instrument)
+                timer.skip("decode", "resize")
+            yield index, unit, img_rgb, timer
+
+    def fault(item):
+        index, unit, img_rgb, timer = item
+        if unit is None:
+            yield item
+            return
+        _, level, _, fault_name, seed = unit
+        start = clock(timer)
+        result = apply_fault(img_rgb, fault_name, level, rng=np.random.default_rng(seed), config=config)
+        lap(timer, "fault", start)
+        yield index, unit, result, timer
+
+    def encode(item):
+        index, unit, result, timer = item
+        if unit is None:
+            yield item
+            return
+        start = clock(timer)
+        buffer = io.encode_image(result)
+        lap(timer, "encode", start)
+        yield index, unit, buffer, timer
+
+    def write(item):
+        index, unit, buffer, timer = item
+        if unit is None:
+            yield index, buffer
+            return
+        start = clock(timer)
+        metadata = _fault_metadata(unit, config)
+        buffer.tofile(str(Path(output_path) / metadata["filename"]))
+        lap(timer, "write", start)
+        yield index, timer.attach(metadata) if timer else metadata
+
+    pipeline = StagedPipeline([
+        ("decode", decode, stage_workers["decode"]),
+        ("fault", fault, stage_workers["fault"]),
+        ("encode", encode, stage_workers["encode"]),
+        ("write", write, stage_workers["write"]),
+    ], queue_size=queue_size)
+
+    last_report = time.perf_counter()
+    for result in pipeline.run(source()):
+        if stats_callback and time.perf_counter() - last_report >= 0.5:
+            stats_callback(pipeline.depths())
+            last_report = time.perf_counter()
+        yield result
+
+    stats = pipeline.stats()
+    if stats_callback:
+        stats_callback(pipeline.depths())
+    if log_callback:
+        log_callback("Queue depth (max/mean): " + ", ".join(
+            f"{name}={s['max']}/{s['mean']}" for name, s in stats.items()))
+
+
+class _Value:
+    # Stands in for the tk.StringVar that run_generation reads the input folder from
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class HeadlessApp:
+    """The parts of the GUI app that run_generation reads, for runs off the Tk thread or without a GUI."""
+
+    def __init__(self, input_path, cancel_flag=None):
+        self.input_path = _Value(str(input_path))
+        self.cancel_flag = cancel_flag if cancel_flag is not None else [False]
+
+
 def run_generation(app, selected_levels, selected_faults, output_path,
-    log_callback=None, progress_callback=None, resize_dims=None, parallel=False):
-    cancel_flag = [False]
-    app.cancel_flag = cancel_flag
+    log_callback=None, progress_callback=None, resize_dims=None, parallel=False, workers=None,
+    pipeline=False, stage_workers=None, queue_size=8, stats_callback=None, incremental=True, seed=None,
+    timings=False, timings_callback=None, trace_path=None, decode_cache=None, recursive=False, index_path=None,
+    metadata_log=None, catalog=None):
+    # An app that already has a flag keeps it, so a cancel set before this point still counts
+    cancel_flag = getattr(app, "cancel_flag", None)
+    if cancel_flag is None:
+        cancel_flag = app.cancel_flag = [False]
 
-    image_files = io.list_images(app.input_path.get())
     output_path = Path(output_path)
     output_path.mkdir(parents=True, exist_ok=True)
+    if resize_dims:
+        resize_dims = tuple(resize_dims)
+    if decode_cache is not None and not isinstance(decode_cache, DecodeCache):
+        decode_cache = DecodeCache(decode_cache)
+
+    run_seed = seed if seed is not None else new_run_seed()
+    # One immutable snapshot for the whole run; edits to the config file apply to the next run
+    config = get_config()
+    if log_callback:
+        log_callback(f"Run seed: {run_seed}")
+        log_callback(f"Config snapshot: {config.hash}")
+    per_group = sum(len(f) for f in selected_faults.values())
 
-    global_summary = []
-    total = len(image_files) * len(selected_levels) * sum(len(f) for f in selected_faults.values())
+    manifest = RunManifest(output_path) if incremental else None
+    if catalog is not None and not isinstance(catalog, Catalog):
+        catalog = Catalog(catalog)
+    if manifest or catalog:
+        config_data = config.to_dict()
+        config_hashes = {fault: config_hash({"config": _fault_config(config_data, fault), "resize_dims": resize_dims})
+                         for faults in selected_faults.values() for fault in faults}
+
+    # Units handed to the engine and not yet reported, with the manifest entry each one records,
+    # and the (input, level) of every summary entry still waiting for outputs
+    planned = {}
+    group_keys = {}
+    # The number of units is known once the folder walk ends; until then progress reports None
+    total = None
+    skipped = 0
+
+    def plan():
+        # Inputs are planned and hashed as the walk finds them, so work starts before the listing ends
+        nonlocal total, skipped
+        paths = io.iter_images(app.input_path.get(), recursive=recursive, index_path=index_path)
+        index = 0
+        try:
+            img_path = next(paths, None)
+            while img_path is not None:
+                following = next(paths, None)
+                if following is None:
+                    total = index + len(selected_levels) * per_group
+                input_hash = None
+                if manifest or catalog or decode_cache is not None:
+                    input_hash = manifest.input_hash(img_path) if manifest else file_hash(img_path)
+                for unit in _plan_units([img_path], selected_levels, selected_faults, run_seed):
+                    _, level, _, fault, unit_seed = unit
+                    if index % per_group == 0:
+                        group_keys[index // per_group] = (img_path, level)
+                    entry = None
+                    done = None
+                    if manifest or catalog:
+                        entry = {"input_hash": input_hash, "fault": fault, "level": level,
+                                 "config_hash": config_hashes[fault]}
+                        # Without an explicit seed any earlier draw is acceptable; with one, it must match
+                        if seed is not None:
+                            entry["seed"] = unit_seed
+                    if manifest:
+                        # Outputs whose manifest entry still matches are reported without recomputing them
+                        metadata = _fault_metadata(unit, config)
+                        if manifest.is_current(metadata["filename"], entry):
+                            recorded = manifest.recorded(metadata["filename"])
+                            metadata["seed"] = recorded.get("seed")
+                            metadata["config_snapshot"] = recorded.get("config_snapshot")
+                            done = metadata
+                            skipped += 1
+                    planned[index] = (unit, entry, done is not None)
+                    yield index, unit, input_hash, done
+                    index += 1
+                img_path = following
+            total = index
+        finally:
+            paths.close()
+
+    # Keyword arguments for a UnitTimer on each unit, or None when nothing is measured
+    instrument = None
+    if timings or trace_path:
+        instrument = {"timings": timings, "trace": trace_path is not None}
+    trace = TraceWriter(trace_path) if trace_path else None
+
+    work = plan()
+    workers = max(1, workers or os.cpu_count() or 1)
+    if pipeline:
+        stage_workers = {"decode": 1, "fault": workers, "encode": 2, "write": 1, **(stage_workers or {})}
+        results = _run_pipeline(work, output_path, resize_dims, config, cancel_flag, instrument, decode_cache,
+                                stage_workers, queue_size, log_callback, stats_callback)
+    elif parallel:
+        results = _run_parallel(work, output_path, resize_dims, config, cancel_flag, instrument, decode_cache, workers)
+    else:
+        results = _run_serial(work, output_path, resize_dims, config, cancel_flag, instrument, decode_cache)
+
+    # Units may finish out of order; an (image, level) entry is written to the
+    # metadata log once all of its faults are done, so no summary is kept in memory.
+    # The log keeps earlier runs' entries: groups whose outputs were all up to date
+    # are only written again when the log starts out empty.
+    pending = {}
+    fresh = set()
+    # Inputs with units still to report, by position in the walk, to count this run's images
+    open_images = {}
+    per_image = per_group * len(selected_levels)
+    images = 0
+    if metadata_log is None:
+        metadata_log = output_path / io.METADATA_LOG_NAME
+    if not isinstance(metadata_log, io.MetadataLog):
+        metadata_log = io.MetadataLog(metadata_log, csv_path=Path(metadata_log).with_suffix(".csv"))
+    metadata_log.open()
+
+    def finish_group(group, faults_metadata):
+        img_path, level = group_keys.pop(group)
+        base_name = Path(img_path).stem
+        entry = {
+            "base_name": base_name,
+            "level": level,
+            "timestamp": datetime.now().isoformat(),
+            "faults": [faults_metadata[i] for i in sorted(faults_metadata)]
+        }
+        if group in fresh or metadata_log.is_new:
+            metadata_log.append(entry)
+        fresh.discard(group)
+        if log_callback:
+            log_callback(f"Processed: {base_name} - {level} ({len(faults_metadata)} faults)")
+
+    # Skipped outputs carry no timings, so the aggregate only covers work done in this run
+    stage_timings = StageTimings() if timings else None
+    catalog_rows = []
+    output_root = output_path.resolve()
     current = 0
+    last_save = last_timings = time.perf_counter()
+    try:
+        for index, fault_metadata in results:
+            unit, entry, reused = planned.pop(index)
+            spans = fault_metadata.pop(TRACE_KEY, None)
+            if trace and spans:
+                trace.add_unit(unit, spans)
+            image = index // per_image
+            if image not in open_images:
+                images += 1
+            open_images[image] = open_images.get(image, 0) + 1
+            if open_images[image] == per_image:
+                del open_images[image]
+            group = index // per_group
+            if not reused:
+                fresh.add(group)
+            pending.setdefault(group, {})[index] = fault_metadata
+            if len(pending[group]) == per_group:
+                finish_group(group, pending.pop(group))
 
-    for img_path in image_files:
-        if cancel_flag[0]:
-            break
+            if manifest:
+                manifest.record(fault_metadata["filename"], {
+                    **entry,
+                    "seed": fault_metadata["seed"],
+                    "config_snapshot": fault_metadata["config_snapshot"]
+                })
+            if catalog:
+                catalog_rows.append(_catalog_row(unit, fault_metadata, output_root, entry))
+
+            # Manifest and catalog are persisted periodically rather than per output
+            if time.perf_counter() - last_save >= 5:
+                if manifest:
+                    manifest.save()
+                if catalog:
+                    catalog.record(catalog_rows)
+                    catalog_rows = []
+                last_save = time.perf_counter()
+
+            if stage_timings is not None:
+                stage_timings.add(fault_metadata)
+                if timings_callback and time.perf_counter() - last_timings >= 0.5:
+                    timings_callback(stage_timings.summary())
+                    last_timings = time.perf_counter()
+
+            current += 1
+            if progress_callback:
+                progress_callback(current, total)
+
+        # Cancelled runs still report the outputs that were written
+        for group, faults_metadata in pending.items():
+            finish_group(group, faults_metadata)
+    finally:
+        # The engine is stopped before the walk so a pipeline's feeder thread is done with it
+        results.close()
+        work.close()
+        # Saved even when the run fails so a re-run resumes where this one stopped
+        if manifest:
+            manifest.close()
+        if trace:
+            trace.close()
+        metadata_log.close()
+        if catalog:
+            catalog.record(catalog_rows)
+            catalog.close()
 
-        img = cv2.imread(str(img_path))
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        if resize_dims:
-            img_rgb = cv2.resize(img_rgb, resize_dims)
-        base_name = img_path.stem
-
-        for level in selected_levels:
-            faults_metadata = []
-            for category, faults in selected_faults.items():
-                for fault in faults:
-                    result = apply_fault(img_rgb, fault, level)
-                    out_name = f"{base_name}_{fault}_{category}_{level}.jpg"
-                    out_path = output_path / out_name
-                    cv2.imwrite(str(out_path), cv2.cvtColor(result, cv2.COLOR_RGB2BGR))
-                    faults_metadata.append({
-                        "filename": out_name,
-                        "type": fault,
-                        "category": category
-                    })
-
-                    current += 1
-                    if progress_callback:
-                        progress_callback(current, total)
-
-            global_summary.append({
-                "base_name": base_name,
-                "level": level,
-                "timestamp": datetime.now().isoformat(),
-                "faults": faults_metadata
-            })
-
-            if log_callback:
-                log_callback(f"Processed: {base_name} - {level} ({len(faults_metadata)} faults)")
-
-    return global_summary
+    if log_callback and skipped:
+        log_callback(f"Skipped {skipped} up-to-date outputs")
+    # The log spans every run into this folder, so this run's own numbers travel beside it
+    metadata_log.run_stats = {
+        "images": images,
+        "outputs": current - skipped,
+        "skipped": skipped,
+        "stage_timings": stage_timings.summary() if stage_timings is not None else None,
+    }
+    if stage_timings is not None and timings_callback:
+        timings_callback(metadata_log.run_stats["stage_timings"])
+    return metadata_log
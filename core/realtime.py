@@ -0,0 +1,246 @@
+import sys
+import json
+import math
+import time
+import bisect
+import socket
+import argparse
+import cv2
+import numpy as np
+from core.config import FAULT_LEVELS
+from faults.dispatcher import TABLE_FUNCTIONS
+from faults.rng import new_run_seed
+from faults.session import FaultSession
+
+# From most to least faithful; each frame gets the first plan that fits its remaining budget
+PLANS = ("full", "simplified", "passthrough")
+
+PIXEL_FORMATS = ("rgb24", "bgr24")
+
+# Latency buckets in ms: 100 per decade from 10 us to 10 s, so percentiles are within 2.3%
+HISTOGRAM_EDGES = np.geomspace(0.01, 10000, 601).tolist()
+
+# Weight of the newest sample in a plan's cost estimate, and how fast unused estimates fade
+COST_SMOOTHING = 0.2
+COST_DECAY = 0.99
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets; recording is O(log buckets) and never allocates."""
+
+    def __init__(self, edges=HISTOGRAM_EDGES):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.total = 0
+        self.max = 0.0
+
+    def record(self, ms):
+        self.counts[bisect.bisect_left(self.edges, ms)] += 1
+        self.total += 1
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        # Upper edge of the bucket holding the p-th percentile, capped at the largest sample
+        if not self.total:
+            return None
+        rank = max(math.ceil(p / 100 * self.total), 1)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.edges[i] if i < len(self.edges) else self.max, self.max)
+
+    def to_dict(self):
+        percentiles = {f"p{p}": self.percentile(p) for p in (50, 90, 99)}
+        return {
+            "count": self.total,
+            **{key: round(value, 3) if value is not None else None for key, value in percentiles.items()},
+            "max": round(self.max, 3),
+            # [upper edge, count] for every non-empty bucket; the overflow bucket has no edge
+            "buckets": [[round(self.edges[i], 4) if i < len(self.edges) else None, count]
+                        for i, count in enumerate(self.counts) if count],
+        }
+
+
+class RealtimeInjector:
+    """Applies a fault to frames as they arrive, within a per-frame latency budget.
+
+    The budget defaults to one frame interval at ``fps``. Each frame gets the
+    most faithful plan whose estimated cost fits in what is left of its budget:
+    ``full`` runs the whole chain, ``simplified`` keeps only the lookup-table and
+    temporal steps, and ``passthrough`` forwards the frame untouched. Cost
+    estimates are moving averages, and those of idle plans fade so that a better
+    plan is tried again once the load drops.
+    """
+
+    def __init__(self, fault, level, size, fps=30.0, budget_ms=None, seed=None, config=None):
+        width, height = size
+        self.shape = (height, width, 3)
+        self.fps = fps
+        self.budget = (budget_ms if budget_ms is not None else 1000 / fps) / 1000
+        self.seed = seed if seed is not None else new_run_seed()
+        self.session = FaultSession(fault, level, fps, rng=np.random.default_rng(self.seed), config=config)
+        expensive = frozenset(name for name, _, state in self.session.steps
+                              if state is None and name not in TABLE_FUNCTIONS)
+        self.skip = {"full": frozenset(), "simplified": expensive}
+        self.cost = {plan: None for plan in PLANS}
+        self.write_cost = 0.0
+        self.out = np.empty(self.shape, dtype=np.uint8)
+        self.plans = {plan: 0 for plan in PLANS}
+        self.latency = LatencyHistogram()
+        self.missed = 0
+
+    def _estimate(self, plan, seconds):
+        cost = self.cost[plan]
+        self.cost[plan] = seconds if cost is None else cost + COST_SMOOTHING * (seconds - cost)
+
+    def choose(self, remaining):
+        for plan in PLANS[:-1]:
+            cost = self.cost[plan]
+            if cost is None or cost <= remaining:
+                return plan
+        return "passthrough"
+
+    def process(self, frame, arrival):
+        """Fault one RGB frame that was read at ``arrival`` (a ``perf_counter`` time)."""
+        remaining = self.budget - (time.perf_counter() - arrival) - self.write_cost
+        plan = self.choose(remaining)
+        start = time.perf_counter()
+        if plan == "passthrough":
+            result = frame
+        else:
+            result = self.session.apply(frame, out=self.out, skip=self.skip[plan])
+        self._estimate(plan, time.perf_counter() - start)
+        for other in PLANS[:-1]:
+            if other != plan and self.cost[other] is not None:
+                self.cost[other] *= COST_DECAY
+        self.plans[plan] += 1
+        return result
+
+    def delivered(self, arrival, write_seconds):
+        self.write_cost += COST_SMOOTHING * (write_seconds - self.write_cost)
+        latency = time.perf_counter() - arrival
+        self.latency.record(latency * 1000)
+        if latency > self.budget:
+            self.missed += 1
+
+    def stats(self):
+        return {
+            "frames": self.latency.total,
+            "fps": self.fps,
+            "budget_ms": round(self.budget * 1000, 3),
+            "seed": self.seed,
+            "missed_deadlines": self.missed,
+            "plans": self.plans,
+            "dropped_frames": self.session.dropped,
+            "latency_ms": self.latency.to_dict(),
+        }
+
+
+def open_stream(spec, mode):
+    """Open ``-`` (stdin/stdout), ``unix:/path``, ``tcp:host:port`` or a file or FIFO path as a binary stream."""
+    if spec == "-":
+        return (sys.stdin if mode == "rb" else sys.stdout).buffer
+    if spec.startswith("unix:"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(spec[len("unix:"):])
+        return sock.makefile(mode)
+    if spec.startswith("tcp:"):
+        host, port = spec[len("tcp:"):].rsplit(":", 1)
+        sock = socket.create_connection((host, int(port)))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock.makefile(mode)
+    return open(spec, mode)
+
+
+def _read_exact(stream, view):
+    filled = 0
+    while filled < len(view):
+        count = stream.readinto(view[filled:])
+        if not count:
+            if filled:
+                raise ValueError(f"Stream ended in the middle of a frame ({filled} of {len(view)} bytes).")
+            return False
+        filled += count
+    return True
+
+
+def run_realtime(source, sink, injector, pixel_format="rgb24", max_frames=None, cancel_flag=None):
+    """Pump raw frames from ``source`` through ``injector`` into ``sink`` until the source ends.
+
+    Frames are packed ``width x height x 3`` bytes in ``pixel_format``; every
+    buffer is allocated once up front. Returns ``injector.stats()``.
+    """
+    if pixel_format not in PIXEL_FORMATS:
+        raise ValueError(f"Unknown pixel format '{pixel_format}'; use one of {', '.join(PIXEL_FORMATS)}.")
+    raw = bytearray(int(np.prod(injector.shape)))
+    view = memoryview(raw)
+    frame = np.frombuffer(raw, dtype=np.uint8).reshape(injector.shape)
+    bgr = pixel_format == "bgr24"
+    if bgr:
+        rgb = np.empty(injector.shape, dtype=np.uint8)
+        converted = np.empty(injector.shape, dtype=np.uint8)
+    while max_frames is None or injector.latency.total < max_frames:
+        if cancel_flag and cancel_flag[0]:
+            break
+        if not _read_exact(source, view):
+            break
+        arrival = time.perf_counter()
+        result = injector.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb) if bgr else frame, arrival)
+        if bgr:
+            result = cv2.cvtColor(result, cv2.COLOR_RGB2BGR, dst=converted)
+        start = time.perf_counter()
+        sink.write(result)
+        sink.flush()
+        injector.delivered(arrival, time.perf_counter() - start)
+    return injector.stats()
+
+
+def _size(value):
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got '{value}'")
+    return width, height
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inject faults into a live raw video feed within a latency budget.")
+    parser.add_argument("--input", default="-", help="'-' for stdin, unix:/path, tcp:host:port or a file/FIFO")
+    parser.add_argument("--output", default="-", help="'-' for stdout, unix:/path, tcp:host:port or a file/FIFO")
+    parser.add_argument("--size", type=_size, required=True, help="frame size as WIDTHxHEIGHT")
+    parser.add_argument("--fault", required=True, help="fault name or '+'-joined chain")
+    parser.add_argument("--level", default="medium", choices=FAULT_LEVELS)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--budget-ms", type=float, help="per-frame latency budget (default: one frame interval)")
+    parser.add_argument("--pixel-format", default="rgb24", choices=PIXEL_FORMATS)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--stats", help="write latency stats and histograms to this JSON file")
+    args = parser.parse_args(argv)
+
+    # stdout may be carrying frames, so stats only go to stderr and --stats
+    try:
+        injector = RealtimeInjector(args.fault, args.level, args.size, fps=args.fps, budget_ms=args.budget_ms,
+                                    seed=args.seed)
+        source, sink = open_stream(args.input, "rb"), open_stream(args.output, "wb")
+    except (OSError, ValueError) as e:
+        print(json.dumps({"status": "error", "error": str(e)}), file=sys.stderr)
+        return 2
+    try:
+        stats = run_realtime(source, sink, injector, pixel_format=args.pixel_format)
+    except KeyboardInterrupt:
+        stats = injector.stats()
+    except Exception as e:
+        print(json.dumps({"status": "error", "error": f"{type(e).__name__}: {e}"}), file=sys.stderr)
+        return 1
+    finally:
+        for stream in (source, sink):
+            if stream not in (sys.stdin.buffer, sys.stdout.buffer):
+                stream.close()
+    if args.stats:
+        with open(args.stats, "w") as f:
+            json.dump(stats, f, indent=4)
+    summary = {key: value for key, value in stats.items() if key != "latency_ms"}
+    summary["latency_ms"] = {key: value for key, value in stats["latency_ms"].items() if key != "buckets"}
+    print(json.dumps({"status": "ok", **summary}), file=sys.stderr)
+    return 0
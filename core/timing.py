@@ -0,0 +1,81 @@
+import os
+import time
+import threading
+import multiprocessing
+
+STAGES = ("decode", "resize", "fault", "encode", "write")
+TRACE_KEY = "_trace_spans"
+
+
+def _track():
+    # Pool workers run units on their main thread, so they are told apart by process name
+    thread = threading.current_thread()
+    if thread is threading.main_thread():
+        return os.getpid(), multiprocessing.current_process().name
+    return os.getpid(), thread.name
+
+
+class UnitTimer:
+    """Stage durations of one work unit and, when tracing, the absolute span of each stage."""
+
+    def __init__(self, timings=True, trace=False):
+        self.timings = timings
+        self.durations = {}
+        self.spans = [] if trace else None
+
+    def lap(self, stage, start):
+        now = time.perf_counter()
+        self.durations[stage] = round((now - start) * 1000, 3)
+        if self.spans is not None:
+            self.spans.append((stage, start, now, _track()))
+        return now
+
+    def skip(self, *stages):
+        # Stages served by work done for an earlier unit, e.g. a cached decode
+        self.durations.update(dict.fromkeys(stages, 0.0))
+
+    def attach(self, metadata):
+        if self.timings:
+            metadata["timings_ms"] = self.durations
+        if self.spans is not None:
+            metadata[TRACE_KEY] = self.spans
+        return metadata
+
+
+def clock(timer):
+    # Start of the first stage; ``timer`` is None when disabled, and then nothing reads the clock
+    return None if timer is None else time.perf_counter()
+
+
+def lap(timer, stage, start):
+    # Ends ``stage`` now and returns now as the start of the next one
+    if timer is None:
+        return None
+    return timer.lap(stage, start)
+
+
+class StageTimings:
+    """Per-fault totals of the stage durations recorded on each work unit."""
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, fault_metadata):
+        timings = fault_metadata.get("timings_ms")
+        if timings is None:
+            return
+        totals = self.totals.setdefault(fault_metadata["type"], {"units": 0, **dict.fromkeys(STAGES, 0.0)})
+        totals["units"] += 1
+        for stage, ms in timings.items():
+            totals[stage] += ms
+
+    def summary(self):
+        return {
+            fault: {
+                "units": totals["units"],
+                "total_ms": {stage: round(totals[stage], 3) for stage in STAGES},
+                "mean_ms": {stage: round(totals[stage] / totals["units"], 3) for stage in STAGES},
+            }
+            for fault, totals in self.totals.items()
+        }
+
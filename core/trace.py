@@ -0,0 +1,47 @@
+import os
+import json
+import time
+from pathlib import Path
+
+
+class TraceWriter:
+    """Streams a Chrome trace-event file that chrome://tracing and ui.perfetto.dev can open.
+
+    Every worker thread or process gets its own track and every stage of a
+    unit becomes one complete ("X") event on the track that ran it.
+    Timestamps are microseconds since the writer was created.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = self.path.open("w")
+        self.file.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+        self.origin = time.perf_counter()
+        self.tracks = {}
+        self._first = True
+
+    def _write(self, event):
+        self.file.write(("" if self._first else ",\n") + json.dumps(event))
+        self._first = False
+
+    def _us(self, t):
+        return round((t - self.origin) * 1e6, 1)
+
+    def add_unit(self, unit, spans):
+        img_path, level, category, fault, _ = unit
+        args = {"image": Path(img_path).stem, "fault": fault, "category": category, "level": level}
+        for stage, start, end, (pid, track) in spans:
+            tid = self.tracks.setdefault((pid, track), len(self.tracks) + 1)
+            self._write({"name": stage, "cat": fault, "ph": "X", "ts": self._us(start),
+                         "dur": self._us(end) - self._us(start), "pid": pid, "tid": tid, "args": args})
+
+    def close(self):
+        # Track names go last because worker tracks are only known once their spans arrive
+        for pid in {pid for pid, _ in self.tracks}:
+            name = "run_generation" if pid == os.getpid() else f"worker {pid}"
+            self._write({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}})
+        for (pid, track), tid in self.tracks.items():
+            self._write({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": track}})
+        self.file.write("\n]}\n")
+        self.file.close()
@@ -0,0 +1,218 @@
+import os
+import re
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from core import io
+from core.config_editor import resolve_config
+from core.pipeline import StagedPipeline
+from faults import apply_fault
+from faults.session import FaultSession, is_temporal
+from faults.rng import new_run_seed, unit_seed
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v")
+
+# Codec used for each output container
+FOURCC = {".mp4": "mp4v", ".m4v": "mp4v", ".mov": "mp4v", ".mkv": "mp4v", ".avi": "MJPG"}
+
+DEFAULT_FPS = 30.0
+
+
+def is_stream(source):
+    # Video files and printf-style sequences ("frames/%05d.png"); a folder is only a sequence when asked for
+    source = str(source)
+    return source.lower().endswith(VIDEO_EXTENSIONS) or "%" in Path(source).name
+
+
+def stream_name(source):
+    # "clip.mp4" -> "clip", "shots/cam0/%05d.png" -> "cam0"
+    path = Path(source)
+    return path.parent.name if "%" in path.name else path.stem
+
+
+def _natural_key(path):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path.name)]
+
+
+def _open_capture(source):
+    capture = cv2.VideoCapture(str(source))
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video or image sequence '{source}'.")
+    return capture
+
+
+def probe(source, default_fps=DEFAULT_FPS):
+    """Return ``(fps, frame_count)``; the count is None when the source doesn't report one."""
+    if Path(source).is_dir():
+        return default_fps, sum(1 for _ in io.iter_images(source))
+    capture = _open_capture(source)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    return (fps if fps > 0 else default_fps), (count if count > 0 else None)
+
+
+def iter_frames(source, resize_dims=None):
+    """Yield RGB frames one at a time from a video file, a printf-style image
+    sequence or a folder of numbered images (in natural order).
+    """
+    if Path(source).is_dir():
+        for path in sorted(io.iter_images(source), key=_natural_key):
+            yield io.load_image(path, resize_dims)
+        return
+    capture = _open_capture(source)
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield io.resize_image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), resize_dims)
+    finally:
+        capture.release()
+
+
+class FrameWriter:
+    """Writes RGB frames to a video file, or to numbered ``frame_ext`` files
+    when ``path`` is not a video file name.
+    """
+
+    def __init__(self, path, fps=DEFAULT_FPS, frame_ext=".png"):
+        self.path = Path(path)
+        self.fps = fps
+        self.frame_ext = frame_ext
+        self.video = self.path.suffix.lower() in VIDEO_EXTENSIONS
+        self.writer = None
+        self.frames = 0
+        (self.path.parent if self.video else self.path).mkdir(parents=True, exist_ok=True)
+
+    def encode(self, frame):
+        # Runs on the encode workers for per-frame output; video frames are encoded by VideoWriter itself
+        return frame if self.video else io.encode_image(frame, self.frame_ext)
+
+    def write(self, encoded):
+        if not self.video:
+            encoded.tofile(str(self.path / f"{self.frames:06d}{self.frame_ext}"))
+        else:
+            if self.writer is None:
+                height, width = encoded.shape[:2]
+                fourcc = cv2.VideoWriter_fourcc(*FOURCC[self.path.suffix.lower()])
+                self.writer = cv2.VideoWriter(str(self.path), fourcc, self.fps, (width, height))
+                if not self.writer.isOpened():
+                    raise OSError(f"Could not open '{self.path}' for writing.")
+            self.writer.write(cv2.cvtColor(encoded, cv2.COLOR_RGB2BGR))
+        self.frames += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+
+
+def process_streams(source, branches, resize_dims=None, seed=None, config=None, fps=None, workers=None,
+                    queue_size=8, frame_ext=".png", progress_callback=None, cancel_flag=None):
+    """Decode ``source`` once and write one faulted copy per ``(output, fault, level)`` in ``branches``.
+
+    Frames are decoded on the feeding thread and fanned out to every branch:
+    temporal faults (``temporal_lag``, ``frame_drop``, ``flicker``) run through
+    one ``FaultSession`` per branch on a single worker so they see frames in
+    order, the other faults run on ``workers`` threads, and encoding has its
+    own stage. Queues between stages are bounded, so only a few frames are held
+    in memory whatever the clip length. Each branch's frames are written in
+    source order, and each frame gets its own generator derived from ``seed``,
+    so a branch matches what ``process_stream`` writes for it alone. Returns a
+    summary dict per branch.
+    """
+    run_seed = seed if seed is not None else new_run_seed()
+    config = resolve_config(config)
+    source_rate, total = probe(source)
+    fps = fps or source_rate
+    base_name = stream_name(source)
+    workers = workers or os.cpu_count() or 1
+    writers = [FrameWriter(output, fps, frame_ext) for output, _, _ in branches]
+    sessions = {}
+    for n, (_, fault, level) in enumerate(branches):
+        if is_temporal(fault):
+            sessions[n] = FaultSession(fault, level, fps, config=config,
+                                       rng=np.random.default_rng(unit_seed(run_seed, base_name, fault, level)))
+
+    def frame_rng(n, index):
+        _, fault, level = branches[n]
+        return np.random.default_rng(unit_seed(run_seed, base_name, fault, level, frame=index))
+
+    def temporal_stage(item):
+        index, frame = item
+        yield index, frame, {n: session.apply(frame, rng=frame_rng(n, index)) for n, session in sessions.items()}
+
+    def fault_stage(item):
+        index, frame, results = item
+        for n, (_, fault, level) in enumerate(branches):
+            if n in results:
+                yield index, n, results[n]
+            else:
+                yield index, n, apply_fault(frame, fault, level, rng=frame_rng(n, index), config=config)
+
+    def encode_stage(item):
+        index, n, frame = item
+        yield index, n, writers[n].encode(frame)
+
+    stages = [("fault", fault_stage, workers),
+              ("encode", encode_stage, 1 if all(writer.video for writer in writers) else workers)]
+    frames = enumerate(iter_frames(source, resize_dims))
+    if sessions:
+        stages.insert(0, ("temporal", temporal_stage, 1))
+    else:
+        frames = ((index, frame, {}) for index, frame in frames)
+    pipeline = StagedPipeline(stages, queue_size=queue_size)
+    start = time.perf_counter()
+    results = pipeline.run(frames)
+    # Workers finish out of order; frames wait here until their predecessors in the branch are written
+    pending = [{} for _ in branches]
+    written = 0
+    try:
+        for index, n, encoded in results:
+            pending[n][index] = encoded
+            while writers[n].frames in pending[n]:
+                writers[n].write(pending[n].pop(writers[n].frames))
+            # A frame counts as done once every branch has written it
+            done = min(writer.frames for writer in writers)
+            if progress_callback and done > written:
+                progress_callback(done, total)
+            written = done
+            if cancel_flag and cancel_flag[0]:
+                break
+    finally:
+        results.close()
+        for writer in writers:
+            writer.close()
+    elapsed = time.perf_counter() - start
+
+    summaries = []
+    for n, (output, fault, level) in enumerate(branches):
+        processed_fps = writers[n].frames / elapsed if elapsed > 0 else None
+        summary = {
+            "source": str(source),
+            "output": str(output),
+            "type": fault,
+            "level": level,
+            "seed": run_seed,
+            "config_snapshot": config.hash,
+            "frames": writers[n].frames,
+            "fps": fps,
+            "seconds": round(elapsed, 3),
+            "processed_fps": round(processed_fps, 2) if processed_fps else None,
+            "realtime_factor": round(processed_fps / fps, 2) if processed_fps else None,
+            "queue_depths": pipeline.stats(),
+        }
+        if n in sessions:
+            summary["dropped_frames"] = sessions[n].dropped
+        summaries.append(summary)
+    return summaries
+
+
+def process_stream(source, output, fault, level="medium", resize_dims=None, seed=None, config=None, fps=None,
+                   workers=None, queue_size=8, frame_ext=".png", progress_callback=None, cancel_flag=None):
+    """Stream ``source`` through ``fault`` at ``level`` into ``output`` and return a summary dict."""
+    return process_streams(source, [(output, fault, level)], resize_dims=resize_dims, seed=seed, config=config,
+                           fps=fps, workers=workers, queue_size=queue_size, frame_ext=frame_ext,
+                           progress_callback=progress_callback, cancel_flag=cancel_flag)[0]
@@ -1 +1,2 @@
-from .dispatcher import apply_fault
+from .dispatcher import apply_fault, apply_fault_batch, apply_chain
+from .session import FaultSession
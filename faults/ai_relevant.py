@@ -1,58 +1,57 @@
 import cv2
 import numpy as np
-import time
-from core.config_editor import load_config
+from core.config_editor import resolve_config
+from faults.rng import resolve_rng
 
-config = load_config()
+def temporal_lag(image, level, rng=None, config=None):
+    # A still image has no earlier frame to show; streams get the real lag from faults.session.FaultSession
+    return image.copy()
 
-def _seed_random():
-    np.random.seed((int(time.time() * 1_000_000) + np.random.randint(0, 9999)) % (2**32 - 1))
 
+def _jitter_maps(h, w, jitter, rng):
+    # Every pixel reads from a uniform random offset in [-jitter, jitter]; replicated
+    # borders give the same edge clamping as clipping the source coordinates.
+    offsets = rng.integers(-jitter, jitter + 1, (2, h, w), dtype=np.int16).astype(np.float32)
+    offsets[0] += np.arange(w, dtype=np.float32)
+    offsets[1] += np.arange(h, dtype=np.float32)[:, None]
+    return offsets[0], offsets[1]
 
-def temporal_lag(image, level):
-    dummy = image.copy()
-    cv2.putText(dummy, f"[TODO: Temporal Lag - {level}]", (30, dummy.shape[0] // 2),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-    return dummy
 
-
-def spatial_jitter(image, level):
-    _seed_random()
+def spatial_jitter(image, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
     jitter = int(config.get("spatial_jitter", {}).get(level, 3))
-    img = image.copy()
-    jittered = np.zeros_like(img)
-    for y in range(img.shape[0]):
-        for x in range(img.shape[1]):
-            dy = np.clip(y + np.random.randint(-jitter, jitter + 1), 0, img.shape[0] - 1)
-            dx = np.clip(x + np.random.randint(-jitter, jitter + 1), 0, img.shape[1] - 1)
-            jittered[y, x] = img[dy, dx]
-    return jittered
+    h, w = image.shape[:2]
+    map_x, map_y = _jitter_maps(h, w, jitter, rng)
+    return cv2.remap(image, map_x, map_y, cv2.INTER_NEAREST, borderMode=cv2.BORDER_REPLICATE)
 
 
-def random_patch_noise(image, level):
-    _seed_random()
+def random_patch_noise(image, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
     count = int(config.get("random_patch_noise", {}).get(level, 5))
     img = image.copy()
     h, w = img.shape[:2]
     for _ in range(count):
-        ph = np.random.randint(10, 30)
-        pw = np.random.randint(10, 30)
-        y = np.random.randint(0, h - ph)
-        x = np.random.randint(0, w - pw)
-        patch = np.random.randint(0, 256, (ph, pw, 3), dtype=np.uint8)
+        ph = rng.integers(10, 30)
+        pw = rng.integers(10, 30)
+        y = rng.integers(0, h - ph)
+        x = rng.integers(0, w - pw)
+        patch = rng.integers(0, 256, (ph, pw, 3), dtype=np.uint8)
         img[y:y+ph, x:x+pw] = patch
     return img
 
 
-def warping(image, level):
-    _seed_random()
+def warping(image, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
     factor = int(config.get("warping", {}).get(level, 15))
     h, w = image.shape[:2]
     src = np.float32([[0, 0], [w - 1, 0], [0, h - 1]])
     dst = np.float32([
-        [np.random.randint(0, factor), np.random.randint(0, factor)],
-        [w - 1 - np.random.randint(0, factor), np.random.randint(0, factor)],
-        [np.random.randint(0, factor), h - 1 - np.random.randint(0, factor)]
+        [rng.integers(0, factor), rng.integers(0, factor)],
+        [w - 1 - rng.integers(0, factor), rng.integers(0, factor)],
+        [rng.integers(0, factor), h - 1 - rng.integers(0, factor)]
     ])
     matrix = cv2.getAffineTransform(src, dst)
     return cv2.warpAffine(image, matrix, (w, h))
@@ -1,6 +1,14 @@
+import numpy as np
+from core.config_editor import resolve_config
+from faults.rng import resolve_rng
+from faults.lut import apply_table, compose_tables
 from faults.emi import flicker, color_shift, desaturation, rolling_shutter_skew, salt_pepper_noise
+from faults.emi import color_shift_batch, rolling_shutter_skew_batch, salt_pepper_noise_batch, color_shift_table
 from faults.environmental import blur, brightness, fog, glare, raindrop, lens_dirt
+from faults.environmental import brightness_batch, fog_batch, brightness_table, fog_table
 from faults.hardware import blackout, frame_drop, dead_pixels, hot_pixels, line_dropout
+from faults.hardware import blackout_batch, frame_drop_batch, dead_pixels_batch, hot_pixels_batch, line_dropout_batch
+from faults.hardware import blackout_table, frame_drop_table
 from faults.ai_relevant import temporal_lag, spatial_jitter, random_patch_noise, warping
 
 FAULT_FUNCTIONS = {
@@ -33,8 +41,112 @@ FAULT_FUNCTIONS = {
     "warping": warping,
 }
 
+# Vectorized NxHxWx3 implementations; faults missing here are applied per image
+BATCH_FUNCTIONS = {
+    "color_shift": color_shift_batch,
+    "rolling_shutter_skew": rolling_shutter_skew_batch,
+    "salt_pepper_noise": salt_pepper_noise_batch,
+    "brightness": brightness_batch,
+    "fog": fog_batch,
+    "blackout": blackout_batch,
+    "frame_drop": frame_drop_batch,
+    "dead_pixels": dead_pixels_batch,
+    "hot_pixels": hot_pixels_batch,
+    "line_dropout": line_dropout_batch,
+}
+
+# Pointwise faults compiled to a (256, 3) uint8 lookup table per call
+TABLE_FUNCTIONS = {
+    "color_shift": color_shift_table,
+    "brightness": brightness_table,
+    "fog": fog_table,
+    "blackout": blackout_table,
+    "frame_drop": frame_drop_table,
+}
+
+# Faults that accept ``out=`` and can update a chain's working buffer in place
+INPLACE_FUNCTIONS = {
+    "dead_pixels": dead_pixels,
+    "hot_pixels": hot_pixels,
+    "line_dropout": line_dropout,
+}
+
+CHAIN_SEPARATOR = "+"
+
 
-def apply_fault(image_rgb, fault_name, level):
+def parse_chain(chain, level=None):
+    """Normalize a fault chain to a list of ``(fault_name, level)`` steps.
+
+    ``chain`` is either a ``"fog+salt_pepper_noise"`` string or a sequence whose
+    items are fault names or ``(fault_name, level)`` pairs; bare names use ``level``.
+    """
+    if isinstance(chain, str):
+        chain = chain.split(CHAIN_SEPARATOR)
+    steps = []
+    for step in chain:
+        fault_name, step_level = (step, level) if isinstance(step, str) else step
+        if fault_name not in FAULT_FUNCTIONS:
+            raise ValueError(f"Fault '{fault_name}' is not implemented.")
+        steps.append((fault_name, step_level))
+    if not steps:
+        raise ValueError("Fault chain is empty.")
+    return steps
+
+
+def apply_chain(image_rgb, chain, level=None, rng=None, config=None, out=None):
+    """Apply an ordered fault chain, fusing consecutive pointwise faults into one LUT pass.
+
+    Each step draws from ``rng`` in chain order, so the result matches applying the
+    faults one after another with the same generator. ``out`` is an optional
+    preallocated buffer of the image's shape, reused across calls.
+    """
+    steps = parse_chain(chain, level)
+    rng = resolve_rng(rng)
+    config = resolve_config(config)
+    if out is None:
+        out = np.empty_like(image_rgb)
+    current = image_rgb
+    table = None
+    for fault_name, step_level in steps:
+        if fault_name in TABLE_FUNCTIONS:
+            step_table = TABLE_FUNCTIONS[fault_name](step_level, rng, config)
+            table = step_table if table is None else compose_tables(table, step_table)
+            continue
+        if table is not None:
+            current = apply_table(current, table, dst=out)
+            table = None
+        if fault_name in INPLACE_FUNCTIONS:
+            # Never write into the caller's image; anything else produced by the chain is ours
+            target = out if current is image_rgb else current
+            current = INPLACE_FUNCTIONS[fault_name](current, step_level, rng=rng, config=config, out=target)
+        else:
+            current = FAULT_FUNCTIONS[fault_name](current, step_level, rng=rng, config=config)
+    if table is not None:
+        current = apply_table(current, table, dst=out)
+    return current
+
+
+def apply_fault(image_rgb, fault_name, level, rng=None, config=None):
+    if CHAIN_SEPARATOR in fault_name:
+        return apply_chain(image_rgb, fault_name, level, rng=rng, config=config)
     if fault_name not in FAULT_FUNCTIONS:
         raise ValueError(f"Fault '{fault_name}' is not implemented.")
-    return FAULT_FUNCTIONS[fault_name](image_rgb, level)
+    return FAULT_FUNCTIONS[fault_name](image_rgb, level, rng=rng, config=config)
+
+
+def apply_fault_batch(images_rgb, fault_name, level, rng=None, config=None):
+    if CHAIN_SEPARATOR in fault_name:
+        parse_chain(fault_name)
+    elif fault_name not in FAULT_FUNCTIONS:
+        raise ValueError(f"Fault '{fault_name}' is not implemented.")
+    images_rgb = np.ascontiguousarray(images_rgb)
+    if images_rgb.ndim != 4 or images_rgb.shape[3] != 3 or images_rgb.dtype != np.uint8:
+        raise ValueError(f"Expected an NxHxWx3 uint8 batch, got {images_rgb.dtype} array of shape {images_rgb.shape}.")
+    if fault_name in BATCH_FUNCTIONS:
+        return BATCH_FUNCTIONS[fault_name](images_rgb, level, rng=rng, config=config)
+    rng = resolve_rng(rng)
+    config = resolve_config(config)
+    out = np.empty_like(images_rgb)
+    for n, image in enumerate(images_rgb):
+        out[n] = apply_fault(image, fault_name, level, rng=rng, config=config)
+    return out
@@ -1,24 +1,22 @@
-from core.config_editor import load_config
+from core.config_editor import resolve_config
+from faults.rng import resolve_rng
 import cv2
 import numpy as np
-import time
+from functools import lru_cache
+from faults.lut import IDENTITY, channel_table, apply_table
+from faults.stack import remap_stack
 
-config = load_config()
-
-def _seed_random():
-    np.random.seed((int(time.time() * 1_000_000) + np.random.randint(0, 9999)) % (2**32 - 1))
-
-
-def flicker(image, level):
-    _seed_random()
+def flicker(image, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
     num_stripes = int(config.get("flicker", {}).get(level, 20))
     flicker_img = image.copy()
     rows, cols, _ = flicker_img.shape
     for _ in range(num_stripes):
-        orientation = np.random.choice(['horizontal', 'vertical'])
-        alpha = np.random.uniform(0.2, 0.6)
-        thickness = np.random.randint(3, 10)
-        start = np.random.randint(0, rows if orientation == 'horizontal' else cols)
+        orientation = rng.choice(['horizontal', 'vertical'])
+        alpha = rng.uniform(0.2, 0.6)
+        thickness = rng.integers(3, 10)
+        start = rng.integers(0, rows if orientation == 'horizontal' else cols)
         if orientation == 'horizontal':
             flicker_img[start:start+thickness, :] = np.clip(flicker_img[start:start+thickness, :].astype(np.float32) * alpha, 1, 255).astype(np.uint8)
         else:
@@ -26,47 +24,114 @@ def flicker(image, level):
     return flicker_img
 
 
-def color_shift(image, level):
-    _seed_random()
+def color_shift_table(level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
+    base_shift = int(config.get("color_shift", {}).get(level, 20))
+    r_shift = base_shift + rng.integers(-5, 5)
+    b_shift = -base_shift + rng.integers(-5, 5)
+    # Channels are named as if the image were BGR: the first gets b_shift, the last r_shift
+    return channel_table(IDENTITY + b_shift, IDENTITY, IDENTITY + r_shift)
+
+
+def color_shift(image, level, rng=None, config=None):
+    return apply_table(image, color_shift_table(level, rng, config))
+
+
+def color_shift_batch(images, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
     base_shift = int(config.get("color_shift", {}).get(level, 20))
-    r_shift = base_shift + np.random.randint(-5, 5)
-    b_shift = -base_shift + np.random.randint(-5, 5)
-    b, g, r = cv2.split(image)
-    r = np.clip(r.astype(np.int16) + r_shift, 0, 255).astype(np.uint8)
-    b = np.clip(b.astype(np.int16) + b_shift, 0, 255).astype(np.uint8)
-    return cv2.merge((b, g, r))
+    # Drawn in the same order as color_shift, one (r, b) pair per sample
+    r_shifts, b_shifts = (rng.integers(-5, 5, (len(images), 2)) + [base_shift, -base_shift]).T
+    out = np.empty_like(images)
+    for n in range(len(images)):
+        # A saturating add gives the same result as color_shift's clipped table, without the 3-channel LUT
+        cv2.add(images[n], (int(b_shifts[n]), 0, int(r_shifts[n]), 0), dst=out[n])
+    return out
 
 
-def desaturation(image, level):
-    _seed_random()
-    alpha = config.get("desaturation", {}).get(level, 0.7) + np.random.uniform(-0.05, 0.05)
+def desaturation(image, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
+    alpha = config.get("desaturation", {}).get(level, 0.7) + rng.uniform(-0.05, 0.05)
     gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
     gray_rgb = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
     return cv2.addWeighted(image, 1 - alpha, gray_rgb, alpha, 0)
 
 
-def rolling_shutter_skew(image, level):
-    _seed_random()
+@lru_cache(maxsize=32)
+def _skew_base_maps(rows, cols, max_shift, model, subpixel):
+    # Per-frame-size source maps for the deterministic part of the skew; only the
+    # per-row jitter is drawn on each call.
+    readout = np.arange(rows) / rows
+    if model == "velocity":
+        # Constant horizontal motion during a top-to-bottom readout
+        base = readout * max_shift
+    elif model == "sine":
+        base = (np.sin(readout * np.pi * 2) + 1) / 2 * max_shift
+    else:
+        raise ValueError(f"Unknown rolling shutter model '{model}'.")
+    if not subpixel:
+        base = np.floor(base)
+    # Output column c reads input column c - shift; anything shifted in from outside is black
+    map_x = np.arange(cols, dtype=np.float32)[None, :] - base[:, None].astype(np.float32)
+    map_y = np.repeat(np.arange(rows, dtype=np.float32)[:, None], cols, axis=1)
+    map_x.flags.writeable = False
+    map_y.flags.writeable = False
+    return map_x, map_y
+
+
+def _skew(image, base_x, map_y, subpixel, rng, dst=None):
+    map_x = base_x - rng.integers(-2, 3, (base_x.shape[0], 1)).astype(np.float32)
+    interpolation = cv2.INTER_LINEAR if subpixel else cv2.INTER_NEAREST
+    return cv2.remap(image, map_x, map_y, interpolation, dst=dst,
+                     borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+
+def rolling_shutter_skew(image, level, model="sine", subpixel=False, *, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
     max_shift = int(config.get("rolling_shutter_skew", {}).get(level, 20))
-    rows, cols, _ = image.shape
-    skew_img = np.zeros_like(image)
-    for i in range(rows):
-        shift = int((np.sin(i / rows * np.pi * 2) + 1) / 2 * max_shift + np.random.randint(-2, 3))
-        if shift >= 0:
-            skew_img[i, shift:] = image[i, :cols - shift]
-        else:
-            skew_img[i, :cols + shift] = image[i, -shift:]
-    return skew_img
+    rows, cols = image.shape[:2]
+    base_x, map_y = _skew_base_maps(rows, cols, max_shift, model, subpixel)
+    return _skew(image, base_x, map_y, subpixel, rng)
+
+
+def rolling_shutter_skew_batch(images, level, model="sine", subpixel=False, *, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
+    max_shift = int(config.get("rolling_shutter_skew", {}).get(level, 20))
+    rows, cols = images.shape[1:3]
+    base_x, _ = _skew_base_maps(rows, cols, max_shift, model, subpixel)
+    # Drawn as consecutive _skew calls would draw them
+    map_x = base_x - rng.integers(-2, 3, (len(images), rows, 1)).astype(np.float32)
+    return remap_stack(images, map_x, None, cv2.INTER_LINEAR if subpixel else cv2.INTER_NEAREST,
+                       cv2.BORDER_CONSTANT)
 
 
-def salt_pepper_noise(image, level):
-    _seed_random()
+def salt_pepper_noise(image, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
     density = float(config.get("salt_pepper_noise", {}).get(level, 0.01))
     noisy = image.copy()
     num_salt = int(density * image.size * 0.5)
     num_pepper = int(density * image.size * 0.5)
-    coords = [np.random.randint(0, i - 1, num_salt) for i in image.shape[:2]]
+    coords = [rng.integers(0, i - 1, num_salt) for i in image.shape[:2]]
     noisy[coords[0], coords[1], :] = 255
-    coords = [np.random.randint(0, i - 1, num_pepper) for i in image.shape[:2]]
+    coords = [rng.integers(0, i - 1, num_pepper) for i in image.shape[:2]]
     noisy[coords[0], coords[1], :] = 0
     return noisy
+
+
+def salt_pepper_noise_batch(images, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
+    density = float(config.get("salt_pepper_noise", {}).get(level, 0.01))
+    noisy = images.copy()
+    n, h, w = images.shape[:3]
+    count = int(density * images[0].size * 0.5)
+    samples = np.repeat(np.arange(n), count)
+    noisy[samples, rng.integers(0, h - 1, n * count), rng.integers(0, w - 1, n * count)] = 255
+    noisy[samples, rng.integers(0, h - 1, n * count), rng.integers(0, w - 1, n * count)] = 0
+    return noisy
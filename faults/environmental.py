@@ -1,36 +1,57 @@
-from core.config_editor import load_config
+from core.config_editor import resolve_config
+from faults.rng import resolve_rng
 import cv2
 import numpy as np
-import time
+from faults.lut import IDENTITY, to_table, apply_table, apply_tables
 
-config = load_config()
-
-def _seed_random():
-    np.random.seed((int(time.time() * 1_000_000) + np.random.randint(0, 9999)) % (2**32 - 1))
-
-
-def blur(image, level):
-    _seed_random()
+def blur(image, level, rng=None, config=None):
+    config = resolve_config(config)
     k = int(config.get("blur", {}).get(level, 7))
     k = max(3, k + (k % 2 == 0))  # Ensure odd kernel
     return cv2.GaussianBlur(image, (k, k), 0)
 
-def brightness(image, level):
-    _seed_random()
-    factor = float(config.get("brightness", {}).get(level, 1.7)) + np.random.uniform(0.0, 0.2)
-    return np.clip(image.astype(np.float32) * factor, 0, 255).astype(np.uint8)
+def brightness_table(level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
+    factor = float(config.get("brightness", {}).get(level, 1.7)) + rng.uniform(0.0, 0.2)
+    return to_table(IDENTITY * factor)
+
+
+def brightness(image, level, rng=None, config=None):
+    return apply_table(image, brightness_table(level, rng, config))
+
+
+def brightness_batch(images, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
+    factors = float(config.get("brightness", {}).get(level, 1.7)) + rng.uniform(0.0, 0.2, len(images))
+    # Same truncating tables as brightness_table, built for the whole stack at once
+    return apply_tables(images, np.clip(IDENTITY * factors[:, None], 0, 255).astype(np.uint8))
+
+
+def fog_table(level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
+    alpha = float(config.get("fog", {}).get(level, 0.5)) + rng.uniform(-0.05, 0.05)
+    # Blend towards a constant 200 haze
+    return to_table(np.rint(IDENTITY * (1 - alpha) + 200 * alpha))
+
+
+def fog(image, level, rng=None, config=None):
+    return apply_table(image, fog_table(level, rng, config))
 
 
-def fog(image, level):
-    _seed_random()
-    alpha = float(config.get("fog", {}).get(level, 0.5)) + np.random.uniform(-0.05, 0.05)
-    overlay = np.full_like(image, 200)
-    return cv2.addWeighted(image, 1 - alpha, overlay, alpha, 0)
+def fog_batch(images, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
+    alphas = (float(config.get("fog", {}).get(level, 0.5)) + rng.uniform(-0.05, 0.05, len(images)))[:, None]
+    return apply_tables(images, np.clip(np.rint(IDENTITY * (1 - alphas) + 200 * alphas), 0, 255).astype(np.uint8))
 
 
-def glare(image, level):
-    _seed_random()
-    alpha = float(config.get("glare", {}).get(level, 0.4)) + np.random.uniform(-0.05, 0.05)
+def glare(image, level, rng=None, config=None):
+    config = resolve_config(config)
+    rng = resolve_rng(rng)
+    alpha = float(config.get("glare", {}).get(level, 0.4)) + rng.uniform(-0.05, 0.05)
     overlay = image.copy()
     center = (overlay.shape[1] // 2, overlay.shape[0] // 2)
     radius = min(center) // 2
@@ -39,14 +60,14 @@ def glare(image, level):
     return cv2.addWeighted(overlay, 1, mask, alpha, 0)
 
 
-def raindrop(image, level):
+def raindrop(image, level, rng=None, config=None):
     dummy = image.copy()
     cv2.putText(dummy, f"[TODO: Raindrop effect - {level}]", (30, dummy.shape[0] // 2),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
     return dummy
 
 
-def lens_dirt(image, level):
+def lens_dirt(image, level, rng=None, config=None):
     dummy = image.copy()
     cv2.putText(dummy, f"[TODO: Lens Dirt effect - {level}]", (30, dummy.shape[0] // 2),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
@@ -1,59 +1,92 @@
 import cv2
 import numpy as np
-import time
-from core.config_editor import load_config
+from core.config_editor import resolve_config
+from faults.sensor import get_sensor_profile
+from faults.lut import to_table, apply_table
 
-config = load_config()
+def blackout_table(level, rng=None, config=None):
+    config = resolve_config(config)
+    strength = float(config.get("blackout", {}).get(level, 1.0))
+    return to_table(np.arange(256) * (1 - strength))
 
-def _seed_random():
-    np.random.seed((int(time.time() * 1_000_000) + np.random.randint(0, 9999)) % (2**32 - 1))
 
+def blackout(image, level, rng=None, config=None):
+    return apply_table(image, blackout_table(level, rng, config))
 
-def blackout(image, level):
-    _seed_random()
-    strength = float(config.get("blackout", {}).get(level, 1.0))
-    return (image * (1 - strength)).astype(np.uint8)
+
+def blackout_batch(images, level, rng=None, config=None):
+    # Same table for every sample, so the whole stack goes through one LUT call
+    return apply_table(images.reshape(-1, *images.shape[2:]), blackout_table(level, rng, config)).reshape(images.shape)
 
 
-def frame_drop(image, level):
-    _seed_random()
+def frame_drop_table(level, rng=None, config=None):
+    config = resolve_config(config)
     visibility = float(config.get("frame_drop", {}).get(level, 0.1))
-    return (image * visibility).astype(np.uint8)
-
-
-def dead_pixels(image, level):
-    _seed_random()
-    img = image.copy()
-    density = float(config.get("dead_pixels", {}).get(level, 0.001))
-    num = int(img.shape[0] * img.shape[1] * density)
-    for _ in range(num):
-        y = np.random.randint(0, img.shape[0])
-        x = np.random.randint(0, img.shape[1])
-        img[y, x] = [0, 0, 0]
-    return img
+    return to_table(np.arange(256) * visibility)
+
+
+def frame_drop(image, level, rng=None, config=None):
+    return apply_table(image, frame_drop_table(level, rng, config))
+
+
+def frame_drop_batch(images, level, rng=None, config=None):
+    return apply_table(images.reshape(-1, *images.shape[2:]), frame_drop_table(level, rng, config)).reshape(images.shape)
+
+
+def _output(image, out):
+    # ``out`` may be ``image`` itself, in which case the defects are written in place
+    if out is None:
+        return image.copy()
+    if out is not image:
+        np.copyto(out, image)
+    return out
 
 
-def hot_pixels(image, level):
-    _seed_random()
-    img = image.copy()
-    density = float(config.get("hot_pixels", {}).get(level, 0.001))
-    num = int(img.shape[0] * img.shape[1] * density)
-    for _ in range(num):
-        y = np.random.randint(0, img.shape[0])
-        x = np.random.randint(0, img.shape[1])
-        img[y, x] = [255, 255, 255]
+def _stuck_pixels(image, kind, level, value, config, profile, out=None):
+    config = resolve_config(config)
+    profile = profile or get_sensor_profile(config)
+    density = float(config.get(kind, {}).get(level, 0.001))
+    ys, xs = profile.pixel_defects(kind, image.shape[-3:], level, density)
+    img = _output(image, out)
+    img[..., ys, xs, :] = value
     return img
 
 
-def line_dropout(image, level):
-    _seed_random()
-    img = image.copy()
+def dead_pixels(image, level, rng=None, config=None, profile=None, out=None):
+    return _stuck_pixels(image, "dead_pixels", level, 0, config, profile, out)
+
+
+def dead_pixels_batch(images, level, rng=None, config=None, profile=None):
+    return _stuck_pixels(images, "dead_pixels", level, 0, config, profile)
+
+
+def hot_pixels(image, level, rng=None, config=None, profile=None, out=None):
+    return _stuck_pixels(image, "hot_pixels", level, 255, config, profile, out)
+
+
+def hot_pixels_batch(images, level, rng=None, config=None, profile=None):
+    return _stuck_pixels(images, "hot_pixels", level, 255, config, profile)
+
+
+def line_dropout(image, level, rng=None, config=None, profile=None, out=None):
+    config = resolve_config(config)
+    profile = profile or get_sensor_profile(config)
     lines = int(config.get("line_dropout", {}).get(level, 10))
-    for _ in range(lines):
-        if np.random.rand() > 0.5:
-            row = np.random.randint(0, img.shape[0])
-            img[row:row+2, :] = 0
-        else:
-            col = np.random.randint(0, img.shape[1])
-            img[:, col:col+2] = 0
+    rows, cols = profile.line_defects(image.shape[-3:], level, lines)
+    img = _output(image, out)
+    img[..., rows, :, :] = 0
+    img[..., cols, :] = 0
     return img
+
+
+def line_dropout_batch(images, level, rng=None, config=None, profile=None):
+    config = resolve_config(config)
+    profile = profile or get_sensor_profile(config)
+    out = np.empty_like(images)
+    # Copy and blank about 1 MB at a time so the rows are zeroed while still in cache;
+    # one whole-stack pass ran slower than the per-image loop at 224x224
+    step = max(1, (1 << 20) // images[0].nbytes)
+    for start in range(0, len(images), step):
+        line_dropout(images[start:start + step], level, config=config, profile=profile,
+                     out=out[start:start + step])
+    return out
@@ -0,0 +1,23 @@
+import hashlib
+import numpy as np
+
+
+def resolve_rng(rng=None):
+    # Callers that don't pass a generator get an independent one seeded from OS entropy
+    return rng if rng is not None else np.random.default_rng()
+
+
+def new_run_seed():
+    return int(np.random.SeedSequence().entropy % (1 << 63))
+
+
+def derive_seed(run_seed, *keys):
+    # Stable 63-bit seed for one work unit, e.g. derive_seed(run_seed, base_name, fault, level)
+    digest = hashlib.sha256(repr((int(run_seed),) + tuple(str(key) for key in keys)).encode()).digest()
+    return int.from_bytes(digest[:8], "little") >> 1
+
+
+def unit_seed(run_seed, base_name, fault, level, frame=None):
+    # The one seed layout shared by folder runs, iter_faulted and streams; frames of a stream add their index
+    keys = (base_name, fault, level) if frame is None else (base_name, fault, level, frame)
+    return derive_seed(run_seed, *keys)
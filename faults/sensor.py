@@ -0,0 +1,99 @@
+import os
+import zlib
+import numpy as np
+from pathlib import Path
+from core.config_editor import resolve_config
+
+
+class SensorProfile:
+    """Fixed defect layout of one simulated camera.
+
+    Defect coordinates are drawn once per (defect kind, resolution, level,
+    amount) from ``seed`` and reused for every frame. With ``path`` set, each
+    map is also stored as its own ``.npy`` file in that folder so later runs
+    reuse the same camera. Files are written once, atomically, so parallel
+    workers can share the folder.
+    """
+
+    def __init__(self, seed=0, path=None):
+        self.seed = int(seed)
+        self.path = Path(path) if path else None
+        self._maps = {}
+        if self.path and self._folder().is_dir():
+            for entry in self._folder().glob("*.npy"):
+                if ".tmp." in entry.name:
+                    continue
+                try:
+                    self._maps[entry.stem.replace("~", ":")] = np.load(entry)
+                except (OSError, ValueError):
+                    continue
+
+    def _folder(self):
+        return self.path / f"seed_{self.seed}"
+
+    def _file(self, key):
+        # Keys use ":" separators, which are not allowed in Windows file names
+        return self._folder() / f"{key.replace(':', '~')}.npy"
+
+    def _rng(self, key):
+        return np.random.default_rng([self.seed, zlib.crc32(key.encode())])
+
+    def _cached(self, key, build):
+        if key not in self._maps:
+            self._maps[key] = build(self._rng(key))
+            if self.path:
+                self._store(key)
+        return self._maps[key]
+
+    def pixel_defects(self, kind, shape, level, density):
+        # (2, num) array of row and column indices of stuck pixels
+        h, w = shape[:2]
+        num = int(h * w * density)
+        key = f"{kind}:{h}x{w}:{level}:{density}"
+        return self._cached(key, lambda rng: np.stack([rng.integers(0, h, num), rng.integers(0, w, num)]).astype(np.int32))
+
+    def line_defects(self, shape, level, lines):
+        # Row and column indices of dead readout lines, each failure two lines wide
+        h, w = shape[:2]
+        key = f"line_dropout:{h}x{w}:{level}:{lines}"
+
+        def build(rng):
+            is_row = rng.random(lines) > 0.5
+            starts = np.where(is_row, rng.integers(0, h, lines), rng.integers(0, w, lines))
+            rows = (starts[is_row][:, None] + [0, 1]).ravel()
+            cols = (starts[~is_row][:, None] + [0, 1]).ravel()
+            # Packed as one array so it round-trips through .npy; -1 separates rows from columns
+            return np.concatenate([rows[rows < h], [-1], cols[cols < w]]).astype(np.int32)
+
+        packed = self._cached(key, build)
+        split = int(np.flatnonzero(packed == -1)[0])
+        return packed[:split], packed[split + 1:]
+
+    def _store(self, key):
+        # Only the new map is written; another worker may store the same (identical) map concurrently
+        path = self._file(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, self._maps[key])
+        os.replace(tmp_path, path)
+
+
+# One profile per (sensor_seed, sensor_profile_path), so editing either takes effect on the next frame
+_profiles = {}
+_override = None
+
+
+def get_sensor_profile(config=None):
+    if _override is not None:
+        return _override
+    config = resolve_config(config)
+    key = (int(config.get("sensor_seed", 0)), config.get("sensor_profile_path"))
+    if key not in _profiles:
+        _profiles[key] = SensorProfile(*key)
+    return _profiles[key]
+
+
+def set_sensor_profile(profile):
+    # Pins ``profile`` for every config; None goes back to the config's own profile
+    global _override
+    _override = profile
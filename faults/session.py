@@ -0,0 +1,163 @@
+import numpy as np
+from core.config_editor import resolve_config
+from faults.dispatcher import apply_fault, parse_chain
+from faults.rng import resolve_rng
+
+# Faults whose output depends on earlier frames of the same stream
+TEMPORAL_FAULTS = ("temporal_lag", "frame_drop", "flicker")
+
+# Frames of delay for temporal_lag; each one is a full frame held in the ring buffer
+LAG_FRAMES = {"low": 1, "medium": 3, "extreme": 8}
+MAX_LAG_FRAMES = 30
+# (fraction of frames dropped, mean length of a drop burst in frames)
+DROP_SCHEDULE = {"low": (0.05, 1), "medium": (0.15, 2), "extreme": (0.35, 4)}
+# Light source intensity frequency; 50 Hz mains lighting flickers at 100 Hz
+FLICKER_HZ = 100.0
+# Fraction of the light lost at the trough of each cycle. Stream flicker has its own
+# "flicker_depth" key because the still-image "flicker" setting is a stripe count.
+FLICKER_DEPTH = {"low": 0.2, "medium": 0.4, "extreme": 0.6}
+
+
+def _output(frame, out):
+    if out is None:
+        return frame.copy()
+    np.copyto(out, frame)
+    return out
+
+
+class _Lag:
+    # Ring buffer of the last ``lag + 1`` frames, allocated once on the first frame
+    def __init__(self, level, config, fps):
+        lag = int(config.get("temporal_lag", {}).get(level, LAG_FRAMES.get(level, 3)))
+        self.lag = min(max(lag, 0), MAX_LAG_FRAMES)
+        self.ring = None
+        self.count = 0
+
+    def __call__(self, frame, rng, out):
+        if self.ring is None or self.ring.shape[1:] != frame.shape:
+            self.ring = np.empty((self.lag + 1, *frame.shape), dtype=frame.dtype)
+            self.count = 0
+        size = len(self.ring)
+        np.copyto(self.ring[self.count % size], frame)
+        # Until the buffer fills, the stream holds on its first frame
+        lagged = self.ring[max(self.count - self.lag, 0) % size]
+        self.count += 1
+        return _output(lagged, out)
+
+
+class _Drop:
+    # Dropped frames repeat the last delivered one; drops come in bursts
+    def __init__(self, level, config, fps):
+        rate, burst = DROP_SCHEDULE.get(level, DROP_SCHEDULE["medium"])
+        self.rate = float(config.get("frame_drop_rate", {}).get(level, rate))
+        self.burst = burst
+        self.remaining = 0
+        self.held = None
+        self.dropped = 0
+
+    def drop_next(self, rng):
+        if self.remaining == 0 and rng.random() < self.rate / (self.burst * (1 - self.rate) + self.rate):
+            self.remaining = int(rng.integers(1, 2 * self.burst))
+        if self.remaining:
+            self.remaining -= 1
+            return True
+        return False
+
+    def __call__(self, frame, rng, out):
+        if self.held is None or self.held.shape != frame.shape:
+            self.held = frame.copy()
+        elif self.drop_next(rng):
+            self.dropped += 1
+            return _output(self.held, out)
+        else:
+            np.copyto(self.held, frame)
+        return _output(frame, out)
+
+
+class _Flicker:
+    # Banding from a flickering light seen through a rolling shutter. Each row is
+    # exposed slightly later than the one above, so the light's phase runs down the
+    # frame and carries on into the next frame instead of restarting.
+    def __init__(self, level, config, fps):
+        depth = float(config.get("flicker_depth", {}).get(level, FLICKER_DEPTH.get(level, 0.4)))
+        self.depth = min(max(depth, 0.0), 1.0)
+        self.hz = float(config.get("flicker_hz", FLICKER_HZ))
+        self.fps = fps
+        self.phase = 0.0
+        self.gain = None
+
+    def __call__(self, frame, rng, out):
+        if self.gain is None or self.work.shape != frame.shape:
+            rows = frame.shape[0]
+            self.row_phase = np.arange(rows, dtype=np.float32) * np.float32(2 * np.pi * self.hz / (self.fps * rows))
+            self.gain = np.empty((rows, 1, 1), dtype=np.float32)
+            self.work = np.empty(frame.shape, dtype=np.float32)
+        gain = self.gain[:, 0, 0]
+        np.add(self.row_phase, np.float32(self.phase), out=gain)
+        np.sin(gain, out=gain)
+        # 1 at the light's peak down to 1 - depth at its trough
+        gain *= np.float32(self.depth / 2)
+        gain += np.float32(1 - self.depth / 2)
+        np.multiply(frame, self.gain, out=self.work)
+        self.phase = (self.phase + 2 * np.pi * self.hz / self.fps) % (2 * np.pi)
+        if out is None:
+            out = np.empty_like(frame)
+        np.copyto(out, self.work, casting="unsafe")
+        return out
+
+
+_STATES = {"temporal_lag": _Lag, "frame_drop": _Drop, "flicker": _Flicker}
+
+
+class FaultSession:
+    """Applies a fault (or ``"+"`` chain) to consecutive frames of one stream.
+
+    ``temporal_lag``, ``frame_drop`` and ``flicker`` keep per-stream state: a
+    preallocated ring buffer of recent frames, a bursty drop schedule that
+    repeats the last delivered frame, and light flicker whose phase continues
+    from frame to frame at ``fps``. Other faults are applied frame by frame as
+    usual. Frames must be passed in stream order; with ``out`` the temporal
+    faults run without allocating.
+    """
+
+    def __init__(self, fault, level, fps=30.0, rng=None, config=None):
+        self.config = resolve_config(config)
+        self.rng = resolve_rng(rng)
+        self.steps = [(name, step_level, _STATES[name](step_level, self.config, fps) if name in _STATES else None)
+                      for name, step_level in parse_chain(fault, level)]
+        self.frames = 0
+        self.scratch = [None] * len(self.steps)
+
+    @property
+    def dropped(self):
+        return sum(state.dropped for _, _, state in self.steps if isinstance(state, _Drop))
+
+    def apply(self, frame, rng=None, out=None, skip=()):
+        """Fault the next frame. ``rng`` overrides the session's generator for the
+        stateless steps, and stateless steps named in ``skip`` are left out.
+        """
+        rng = rng if rng is not None else self.rng
+        steps = [(n, step) for n, step in enumerate(self.steps) if step[2] is not None or step[0] not in skip]
+        if not steps:
+            frame = _output(frame, out)
+        last = steps[-1][0] if steps else None
+        for n, (name, level, state) in steps:
+            if state is None:
+                frame = apply_fault(frame, name, level, rng=rng, config=self.config)
+                if n == last and out is not None:
+                    frame = _output(frame, out)
+                continue
+            target = out
+            if n != last:
+                # Intermediate results of a chain go to buffers owned by the session
+                if self.scratch[n] is None or self.scratch[n].shape != frame.shape:
+                    self.scratch[n] = np.empty_like(frame)
+                target = self.scratch[n]
+            # The schedule stays on the session's generator so it doesn't depend on per-frame seeds
+            frame = state(frame, self.rng, target)
+        self.frames += 1
+        return frame
+
+
+def is_temporal(fault):
+    return any(name in TEMPORAL_FAULTS for name, _ in parse_chain(fault))
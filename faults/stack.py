@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+from functools import lru_cache
+
+# cv2.remap converts map coordinates to 16-bit fixed point, so a stacked image must stay below this height
+_MAX_ROWS = 32767
+# Keeps the per-chunk maps around 128 MB whatever the frame size
+_MAX_PIXELS = 1 << 24
+
+
+@lru_cache(maxsize=8)
+def _row_map(rows, cols):
+    map_y = np.repeat(np.arange(rows, dtype=np.float32)[:, None], cols, axis=1)
+    map_y.flags.writeable = False
+    return map_y
+
+
+def remap_stack(images, map_x, map_y, interpolation, border_mode, out=None):
+    """Remap every sample of an NxHxWx3 stack with its own maps, one cv2.remap call per chunk.
+
+    Samples are stacked vertically. ``map_x`` is (N, H, W) in sample columns;
+    ``map_y`` is (N, H, W) in rows of the whole stack (sample n starts at row
+    n * H) and must stay inside its own sample, or None to keep every row in
+    place. Horizontal borders behave as for a single image.
+    """
+    n, h, w = images.shape[:3]
+    chunk = max(1, min(_MAX_ROWS // h, _MAX_PIXELS // (h * w), n))
+    out = np.empty_like(images) if out is None else out
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        rows = (stop - start) * h
+        if map_y is None:
+            ys = _row_map(chunk * h, w)[:rows]
+        else:
+            ys = map_y[start:stop].reshape(rows, w)
+            if start:
+                ys = ys - np.float32(start * h)
+        cv2.remap(images[start:stop].reshape(rows, w, 3), map_x[start:stop].reshape(rows, w), ys, interpolation,
+                  dst=out[start:stop].reshape(rows, w, 3), borderMode=border_mode, borderValue=0)
+    return out
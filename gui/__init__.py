@@ -1,6 +1 @@
-<<<<<<< HEAD
 from .interface import FaultInjectorApp
-
-=======
-from .dispatcher import apply_fault
->>>>>>> 49dfe3f01ada22e2959eae3b626db406419e0e3d
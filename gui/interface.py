@@ -2,15 +2,25 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from core import FAULT_CATEGORIES, FAULT_DESCRIPTIONS
-from core.processing import run_generation
-from core.io import save_metadata_json, save_metadata_csv
+from core.processing import HeadlessApp, run_generation
+from core.io import IMAGE_EXTENSIONS, finalize_metadata, iter_images
+from core.timing import STAGES
 from core import config_editor
+from gui.progress import ProgressChannel, Throughput
+from gui.preview import PreviewRenderer
 from PIL import Image, ImageTk
 import cv2
 import numpy as np
+import os
 import threading
 import time
 
+# Widgets are refreshed from the generation thread's updates at most this often
+PROGRESS_REFRESH_MS = 100
+# Slider drags inside this window collapse into one preview render
+PREVIEW_DEBOUNCE_MS = 30
+
+
 class FaultInjectorApp:
     def __init__(self, root):
         self.root = root
@@ -26,11 +36,19 @@ class FaultInjectorApp:
         self.output_path = tk.StringVar(value=os.path.abspath(default_output).replace('\\', '/'))
         self.export_json = tk.IntVar(value=1)
         self.export_csv = tk.IntVar(value=1)
+        self.stage_timings = tk.IntVar(value=0)
         self.resize_width = tk.IntVar(value=320)
         self.resize_height = tk.IntVar(value=240)
+        self.workers = tk.IntVar(value=os.cpu_count() or 1)
         self.config_resolution = {"resize_width": self.resize_width.get(), "resize_height": self.resize_height.get()}
         self.level_vars = {lvl: tk.IntVar(value=1 if lvl == 'medium' else 0) for lvl in ['low', 'medium', 'extreme']}
         self.fault_vars = {cat: {f: tk.IntVar() for f in faults} for cat, faults in FAULT_CATEGORIES.items()}
+        self.progress_channel = ProgressChannel()
+        self.cancel_flag = [False]
+        self.running = False
+        self.preview_renderer = PreviewRenderer()
+        self.preview_job = None
+        self.preview_photo = None
 
         self.create_widgets()
 
@@ -74,6 +92,14 @@ class FaultInjectorApp:
         self.root.grid_columnconfigure(1, weight=1)
         notebook.add(self.config_frame, text="Configuration")
 
+        preview_frame = tk.Frame(self.config_frame)
+        preview_frame.pack(side="right", fill="y", padx=10, pady=5)
+        tk.Button(preview_frame, text="Preview Image...", command=self.choose_preview_image).pack(anchor="w")
+        self.preview_label = tk.Label(preview_frame, text="Move a slider to preview", width=40, height=15)
+        self.preview_label.pack(pady=5)
+        self.preview_info = tk.Label(preview_frame, text="", font=("Arial", 9))
+        self.preview_info.pack(anchor="w")
+
         canvas = tk.Canvas(self.config_frame)
         scrollbar = tk.Scrollbar(self.config_frame, orient="vertical", command=canvas.yview)
         scroll_frame = tk.Frame(canvas)
@@ -104,7 +130,8 @@ class FaultInjectorApp:
                 frame = tk.Frame(scroll_frame)
                 frame.pack(anchor="w", fill="x", padx=10)
                 tk.Label(frame, text=f"{lvl.title():<8}", width=10).pack(side="left")
-                tk.Scale(frame, from_=0, to=100, orient="horizontal", resolution=0.1, length=250, variable=var).pack(side="left")
+                tk.Scale(frame, from_=0, to=100, orient="horizontal", resolution=0.1, length=250, variable=var,
+                         command=lambda _, f=fault, l=lvl: self.preview(f, l)).pack(side="left")
 
         # Moved to top and bottom
         bottom_button_row = tk.Frame(scroll_frame)
@@ -116,13 +143,18 @@ class FaultInjectorApp:
         export_frame.grid(row=4, column=0, columnspan=3)
         tk.Checkbutton(export_frame, text="Export JSON", variable=self.export_json).pack(side="left", padx=10)
         tk.Checkbutton(export_frame, text="Export CSV", variable=self.export_csv).pack(side="left", padx=10)
+        tk.Checkbutton(export_frame, text="Stage Timings", variable=self.stage_timings).pack(side="left", padx=10)
 
         self.progress = ttk.Progressbar(self.root, length=400, mode='determinate')
         self.progress.grid(row=6, column=0, columnspan=3, pady=5)
 
         action_frame = tk.Frame(self.root)
         action_frame.grid(row=7, column=0, columnspan=3, pady=10)
-        tk.Button(action_frame, text="Start", bg="green", fg="white", command=self.start).pack(side="left", padx=5)
+        self.start_button = tk.Button(action_frame, text="Start", bg="green", fg="white", command=self.start)
+        self.start_button.pack(side="left", padx=5)
+        self.cancel_button = tk.Button(action_frame, text="Cancel", bg="firebrick", fg="white", command=self.cancel,
+                                       state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
         tk.Button(action_frame, text="Reset", bg="gray", fg="white", command=self.reset_form).pack(side="left", padx=5)
         tk.Button(action_frame, text="Select All", bg="lightblue", command=self.select_all_faults_levels).pack(side="left", padx=5)
         tk.Button(action_frame, text="Deselect All", bg="lightgray", command=self.deselect_all_faults_levels).pack(side="left", padx=5)
@@ -132,6 +164,10 @@ class FaultInjectorApp:
         tk.Entry(resolution_frame, textvariable=self.resize_width, width=5).pack(side="left")
         tk.Label(resolution_frame, text="Height:").pack(side="left")
         tk.Entry(resolution_frame, textvariable=self.resize_height, width=5).pack(side="left")
+        tk.Label(resolution_frame, text="Workers:").pack(side="left")
+        tk.Entry(resolution_frame, textvariable=self.workers, width=3).pack(side="left")
+        self.timings_label = tk.Label(self.root, text="", font=("Courier", 9), justify="left")
+        self.timings_label.grid(row=9, column=0, columnspan=3, pady=(0, 10))
         
 
     def toggle_category(self, category, var):
@@ -179,14 +215,49 @@ class FaultInjectorApp:
         messagebox.showinfo("Reset", "All settings reset to default.")
 
     def save_config(self):
-        updated = {f: {lvl: var.get() for lvl, var in lvls.items()} for f, lvls in self.config_sliders.items()}
+        # Start from the saved file so keys without a slider (sensor_seed, flicker_hz, ...) are kept
+        updated = config_editor.load_config()
+        for f, lvls in self.config_sliders.items():
+            updated.setdefault(f, {}).update({lvl: var.get() for lvl, var in lvls.items()})
         updated["resize_width"] = self.resize_width.get()
         updated["resize_height"] = self.resize_height.get()
         config_editor.save_config(updated)
         messagebox.showinfo("Saved", "Configuration updated successfully.")
 
-    def preview(self):
-        pass  # Preview disabled for faster dataset generation
+    def choose_preview_image(self):
+        path = filedialog.askopenfilename(initialdir=self.input_path.get(),
+                                          filetypes=[("Images", " ".join(f"*{ext}" for ext in IMAGE_EXTENSIONS))])
+        if path:
+            self.preview_renderer.set_image(path)
+            self.preview_info.config(text=os.path.basename(path))
+
+    def preview(self, fault, level):
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(PREVIEW_DEBOUNCE_MS, self.render_preview, fault, level)
+
+    def render_preview(self, fault, level):
+        self.preview_job = None
+        if self.preview_renderer.proxy is None:
+            # Default to the first input so the pane works without picking an image
+            try:
+                first = next(iter_images(self.input_path.get()), None)
+            except OSError:
+                first = None
+            if first is None:
+                self.preview_info.config(text="No input image to preview")
+                return
+            self.preview_renderer.set_image(first)
+        value = self.config_sliders[fault][level].get()
+        try:
+            image, ms = self.preview_renderer.render(fault, level, value)
+        except Exception as e:
+            self.preview_info.config(text=f"Preview failed: {e}")
+            return
+        self.preview_photo = ImageTk.PhotoImage(Image.fromarray(image))
+        self.preview_label.config(image=self.preview_photo, text="", width=0, height=0)
+        cached = " (cached)" if ms == 0 else f" ({ms:.0f} ms)"
+        self.preview_info.config(text=f"{fault.replace('_', ' ').title()} / {level} = {value:g}{cached}")
 
     def select_all_faults_levels(self):
         for lvl_var in self.level_vars.values():
@@ -214,34 +285,88 @@ class FaultInjectorApp:
         if not selected_levels or not selected_faults:
             messagebox.showerror("Missing Selection", "Select at least one fault and one intensity level.")
             return
-        start = time.perf_counter()
+        if self.running:
+            return
+
+        # The worker thread never touches widgets; it posts to the channel and
+        # poll_progress applies the latest values from the Tk main loop
+        channel = self.progress_channel
+        timed = bool(self.stage_timings.get())
+        resize_dims = (self.resize_width.get(), self.resize_height.get())
+        output_path = self.output_path.get()
+        # Tk variables are only read here; the worker gets a plain copy sharing the cancel flag
+        app = HeadlessApp(self.input_path.get(), self.cancel_flag)
+        workers = self.workers.get()
+        formats = [fmt for fmt, var in (("json", self.export_json), ("csv", self.export_csv)) if var.get()]
+        self.throughput = Throughput(resize_dims[0] * resize_dims[1] / 1e6)
+        self.timings_label.config(text="")
+        self.time_label.config(text="")
+        self.progress['value'] = 0
+        # Reset in place before the worker starts so a Cancel click right after Start is never lost
+        self.cancel_flag[0] = False
 
         def progress_callback(current, total):
-            elapsed = time.perf_counter() - start
-            est_total = elapsed / max(current, 1) * total
-            remaining = est_total - elapsed
-            mins = int(remaining // 60)
-            secs = int(remaining % 60)
-            self.time_label.config(text=f"ETA: {mins}m {secs}s")
-            percent = int((current / total) * 100)
-            self.progress['value'] = percent
-            self.progress.update_idletasks()
-            self.root.title(f"Advanced Fault Injector - {percent}% complete")
+            channel.post("progress", (current, total))
+
+        def timings_callback(stage_timings):
+            channel.post("timings", stage_timings)
 
         def run():
-            import time
             start = time.perf_counter()
-            from concurrent.futures import ThreadPoolExecutor
-            summary = run_generation(self, selected_levels, selected_faults, self.output_path.get(),
-                                     log_callback=None, progress_callback=progress_callback, resize_dims=(self.resize_width.get(), self.resize_height.get()), parallel=True)
-            if self.export_json.get():
-                save_metadata_json(self.output_path.get(), summary)
-            if self.export_csv.get():
-                save_metadata_csv(self.output_path.get(), summary)
-            import time
-            end = time.perf_counter()
-            duration = round(end - start, 2)
+            try:
+                summary = run_generation(app, selected_levels, selected_faults, output_path,
+                                         progress_callback=progress_callback, resize_dims=resize_dims, parallel=True,
+                                         workers=workers, timings=timed, timings_callback=timings_callback)
+                finalize_metadata(output_path, formats=formats, stage_timings=summary.run_stats["stage_timings"])
+            except Exception as e:
+                channel.post("error", str(e))
+                return
+            channel.post("done", (round(time.perf_counter() - start, 2), self.cancel_flag[0]))
+
+        self.running = True
+        self.start_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(PROGRESS_REFRESH_MS, self.poll_progress)
+
+    def cancel(self):
+        # run_generation stops handing out units; those already running finish and are recorded
+        self.cancel_flag[0] = True
+        self.cancel_button.config(state="disabled")
+        self.time_label.config(text="Cancelling...")
+
+    def poll_progress(self):
+        updates = self.progress_channel.drain()
+        if "progress" in updates:
+            current, total = updates["progress"]
+            per_second, megapixels, eta = self.throughput.rates(current, total)
+            eta_text = f"ETA: {int(eta // 60)}m {int(eta % 60)}s" if eta is not None else "ETA: -"
+            # The total is None until the input folder has been listed to the end
+            shown_total = total if total is not None else "?"
+            self.time_label.config(text=f"{current}/{shown_total} | {eta_text} | {per_second:.1f} img/s | {megapixels:.1f} MP/s")
+            if total is not None:
+                percent = int(current / total * 100) if total else 100
+                self.progress['value'] = percent
+                self.root.title(f"Advanced Fault Injector - {percent}% complete")
+        if "timings" in updates:
+            # Mean ms per unit for each stage, one row per fault
+            rows = [f"{'fault':<22}" + "".join(f"{stage:>9}" for stage in STAGES)]
+            for fault, stats in sorted(updates["timings"].items()):
+                rows.append(f"{fault:<22}" + "".join(f"{stats['mean_ms'][stage]:9.2f}" for stage in STAGES))
+            self.timings_label.config(text="\n".join(rows))
+
+        if "done" in updates or "error" in updates:
+            self.running = False
+            self.start_button.config(state="normal")
+            self.cancel_button.config(state="disabled")
             self.root.title("Advanced Fault Injector")
-            messagebox.showinfo("Done", f"Fault injection complete in {duration} seconds.")
-
-        threading.Thread(target=run).start()
+            if "error" in updates:
+                messagebox.showerror("Generation Failed", updates["error"])
+            else:
+                duration, cancelled = updates["done"]
+                if cancelled:
+                    messagebox.showinfo("Cancelled", f"Fault injection cancelled after {duration} seconds.")
+                else:
+                    messagebox.showinfo("Done", f"Fault injection complete in {duration} seconds.")
+            return
+        self.root.after(PROGRESS_REFRESH_MS, self.poll_progress)
@@ -0,0 +1,51 @@
+import time
+import cv2
+import numpy as np
+from collections import OrderedDict
+from core import io
+from core.config_editor import get_config, ConfigSnapshot
+from faults import apply_fault
+
+
+class PreviewRenderer:
+    """Renders one fault on a downscaled proxy of a chosen image.
+
+    The proxy is decoded once per image and results are cached per
+    ``(fault, level, value)``, so dragging a slider back to an earlier value
+    costs nothing. A fixed seed keeps random faults from flickering between
+    renders.
+    """
+
+    def __init__(self, max_side=320, cache_size=64):
+        self.max_side = max_side
+        self.cache_size = cache_size
+        self.proxy = None
+        self.path = None
+        self._results = OrderedDict()
+
+    def set_image(self, path):
+        if path == self.path:
+            return
+        image = io.read_image(path)
+        scale = self.max_side / max(image.shape[:2])
+        if scale < 1:
+            image = cv2.resize(image, (round(image.shape[1] * scale), round(image.shape[0] * scale)),
+                               interpolation=cv2.INTER_AREA)
+        self.proxy = np.ascontiguousarray(image)
+        self.path = path
+        self._results.clear()
+
+    def render(self, fault, level, value):
+        """Return ``(rgb_array, milliseconds)`` for ``fault`` at ``level`` with the slider ``value``."""
+        key = (fault, level, value)
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key], 0.0
+        start = time.perf_counter()
+        data = get_config().to_dict()
+        data[fault] = {**data.get(fault, {}), level: value}
+        result = apply_fault(self.proxy, fault, level, rng=np.random.default_rng(0), config=ConfigSnapshot(data))
+        self._results[key] = result
+        if len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return result, (time.perf_counter() - start) * 1000
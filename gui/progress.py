@@ -0,0 +1,41 @@
+import queue
+import time
+
+
+class ProgressChannel:
+    """Hands updates from the generation thread to the Tk main loop.
+
+    Workers may ``post`` from any thread and as often as they like; the main
+    loop calls ``drain`` from ``after()`` and gets only the latest value of
+    each kind, so thousands of progress posts between two refreshes turn into
+    one widget update.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def post(self, kind, value=None):
+        self._queue.put((kind, value))
+
+    def drain(self):
+        latest = {}
+        while True:
+            try:
+                kind, value = self._queue.get_nowait()
+            except queue.Empty:
+                return latest
+            latest[kind] = value
+
+
+class Throughput:
+    """Outputs/s, MP/s and ETA since the run started."""
+
+    def __init__(self, megapixels_per_output):
+        self.megapixels_per_output = megapixels_per_output
+        self.start = time.perf_counter()
+
+    def rates(self, current, total):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        per_second = current / elapsed
+        eta = (total - current) / per_second if per_second and total is not None else None
+        return per_second, per_second * self.megapixels_per_output, eta
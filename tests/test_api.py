@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from core.api import iter_faulted
+from faults.rng import unit_seed
+
+
+class TestIterFaulted(unittest.TestCase):
+    def test_arrays_and_paths(self):
+        image = np.random.randint(0, 256, (40, 60, 3), dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "frame.png"
+            cv2.imwrite(str(path), image)
+            results = list(iter_faulted([image, path], ["blur", "dead_pixels"], ["low", "extreme"],
+                                        resize_dims=(32, 24)))
+
+        self.assertEqual(len(results), 8)
+        for array, metadata in results:
+            self.assertEqual(array.shape, (24, 32, 3))
+        metadata = dict(results[0][1])
+        self.assertIsInstance(metadata.pop("seed"), int)
+        self.assertEqual(len(metadata.pop("config_snapshot")), 16)
+        self.assertEqual(metadata, {"base_name": "0", "source_index": 0, "level": "low",
+                                    "type": "blur", "category": "Environmental"})
+        self.assertEqual(results[-1][1]["base_name"], "frame")
+        self.assertEqual(results[-1][1]["category"], "Hardware")
+
+    def test_seeds_match_folder_runs(self):
+        image = np.zeros((16, 16, 3), dtype=np.uint8)
+        _, metadata = next(iter_faulted([image], ["fog"], ["low"], seed=5))
+        self.assertEqual(metadata["seed"], unit_seed(5, "0", "fog", "low"))
+
+    def test_is_lazy(self):
+        def sources():
+            yield np.zeros((16, 16, 3), dtype=np.uint8)
+            raise AssertionError("second source should not be consumed")
+
+        frames = iter_faulted(sources(), {"Environmental": ["fog"]}, ["medium"])
+        array, metadata = next(frames)
+        self.assertEqual(metadata["type"], "fog")
+
+    def test_seed_reproduces_stream(self):
+        image = np.random.randint(0, 256, (32, 48, 3), dtype=np.uint8)
+        faults = ["spatial_jitter", "flicker", "color_shift"]
+        first = list(iter_faulted([image], faults, ["medium"], seed=42))
+        second = list(iter_faulted([image], faults, ["medium"], seed=42))
+        for (a, meta_a), (b, meta_b) in zip(first, second):
+            self.assertEqual(meta_a, meta_b)
+            self.assertTrue(np.array_equal(a, b))
+        other = list(iter_faulted([image], faults, ["medium"], seed=43))
+        self.assertFalse(np.array_equal(first[0][0], other[0][0]))
+
+    def test_rejects_unknown_fault(self):
+        with self.assertRaises(ValueError):
+            list(iter_faulted([np.zeros((8, 8, 3), dtype=np.uint8)], ["nope"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import json
+import tempfile
+import subprocess
+import unittest
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _run_cli(*args):
+    return subprocess.run([sys.executable, str(ROOT / "cli.py"), *args], capture_output=True, text=True, cwd=ROOT)
+
+
+class TestCLI(unittest.TestCase):
+    def test_runs_job_and_reports_stats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            (Path(tmp) / "in").mkdir()
+            for i in range(2):
+                cv2.imwrite(str(Path(tmp) / "in" / f"img{i}.png"), np.random.randint(0, 256, (72, 96, 3), dtype=np.uint8))
+            job = Path(tmp) / "job.json"
+            job.write_text(json.dumps({"input": "in", "output": "out", "faults": ["fog", "dead_pixels"],
+                                       "levels": ["low"], "engine": "serial", "seed": 3, "export": ["csv"]}))
+            result = _run_cli(str(job), "--quiet")
+
+            self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+            stats = json.loads(result.stdout)
+            self.assertEqual((stats["status"], stats["images"], stats["outputs"]), ("ok", 2, 4))
+            self.assertTrue((Path(tmp) / "out" / "global_metadata_summary.csv").exists())
+            self.assertFalse((Path(tmp) / "out" / "global_metadata_summary.json").exists())
+
+            # A rerun reports its own work, not what the metadata log holds from earlier runs
+            stats = json.loads(_run_cli(str(job), "--quiet").stdout)
+            self.assertEqual((stats["images"], stats["outputs"], stats["skipped"]), (2, 0, 4))
+
+    def test_stream_job(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            (Path(tmp) / "cam0").mkdir()
+            for i in range(1, 5):
+                cv2.imwrite(str(Path(tmp) / "cam0" / f"{i:03d}.png"), np.random.randint(0, 256, (24, 32, 3), dtype=np.uint8))
+            job = Path(tmp) / "job.json"
+            job.write_text(json.dumps({"input": "cam0/%03d.png", "output": "out", "faults": ["fog"],
+                                       "levels": ["low", "medium"], "video_output": "frames", "seed": 1}))
+            result = _run_cli(str(job), "--quiet")
+
+            self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+            stats = json.loads(result.stdout)
+            self.assertEqual((stats["streams"], stats["frames"]), (2, 8))
+            self.assertEqual(len(list((Path(tmp) / "out" / "cam0_fog_medium").iterdir())), 4)
+            self.assertTrue((Path(tmp) / "out" / "stream_summary.json").exists())
+
+            # A plain folder of frames is only a stream when the job says so
+            job.write_text(json.dumps({"input": "cam0", "output": "seq", "faults": ["fog"], "levels": ["low"],
+                                       "sequence": True, "video_output": "frames"}))
+            result = _run_cli(str(job), "--quiet")
+            self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+            self.assertEqual(len(list((Path(tmp) / "seq" / "cam0_fog_low").iterdir())), 4)
+
+    def test_bad_job_exits_non_zero(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            job = Path(tmp) / "job.json"
+            job.write_text(json.dumps({"input": ".", "output": "out", "faults": ["nope"]}))
+            result = _run_cli(str(job))
+        self.assertNotEqual(result.returncode, 0)
+        self.assertEqual(json.loads(result.stdout)["status"], "error")
+
+    def test_rejects_bad_value_types(self):
+        from core.cli import JobError, load_job
+        with tempfile.TemporaryDirectory() as tmp:
+            job = Path(tmp) / "job.json"
+            for extra in ({"resize": "640x480"}, {"resize": [640, 0]}, {"workers": "4"}, {"workers": True}):
+                with self.subTest(**extra):
+                    job.write_text(json.dumps({"input": ".", "output": "out", "faults": ["fog"], **extra}))
+                    with self.assertRaises(JobError):
+                        load_job(job)
+
+    def test_does_not_import_tk(self):
+        code = "import sys; import core.cli; sys.exit('tkinter' in sys.modules or 'PIL.ImageTk' in sys.modules)"
+        self.assertEqual(subprocess.run([sys.executable, "-c", code], cwd=ROOT).returncode, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
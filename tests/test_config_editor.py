@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+from core import config_editor
+
+
+class TestConfigSnapshot(unittest.TestCase):
+    def test_reloads_only_when_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "fault_level_config.json"
+            path.write_text(json.dumps({"blur": {"low": 3}}))
+            with mock.patch.object(config_editor, "CONFIG_PATH", path), \
+                    mock.patch.object(config_editor, "_snapshot", None):
+                first = config_editor.get_config()
+                self.assertIs(config_editor.get_config(), first)
+
+                path.write_text(json.dumps({"blur": {"low": 5}}))
+                stat = path.stat()
+                os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+                second = config_editor.get_config()
+
+        self.assertEqual(first["blur"]["low"], 3)
+        self.assertEqual(second["blur"]["low"], 5)
+        self.assertNotEqual(first.hash, second.hash)
+
+    def test_snapshot_is_read_only(self):
+        data = {"fog": {"low": 0.3}}
+        snapshot = config_editor.ConfigSnapshot(data)
+        data["fog"]["low"] = 0.9
+        self.assertEqual(snapshot["fog"]["low"], 0.3)
+        with self.assertRaises(TypeError):
+            snapshot["fog"]["low"] = 0.9
+
+    def test_plain_dicts_are_wrapped_once(self):
+        data = {"fog": {"low": 0.3}}
+        snapshot = config_editor.resolve_config(data)
+        self.assertIs(config_editor.resolve_config(data), snapshot)
+        data["fog"]["low"] = 0.5
+        self.assertEqual(config_editor.resolve_config(data)["fog"]["low"], 0.5)
+
+    def test_sensor_profile_follows_seed(self):
+        from faults.sensor import get_sensor_profile
+        first = get_sensor_profile({"sensor_seed": 1})
+        self.assertIs(get_sensor_profile({"sensor_seed": 1, "fog": {}}), first)
+        self.assertEqual(get_sensor_profile({"sensor_seed": 2}).seed, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
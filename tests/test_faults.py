@@ -3,9 +3,13 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
+import tempfile
 import unittest
 import numpy as np
-from faults import apply_fault
+from faults import apply_fault, apply_fault_batch, apply_chain, FaultSession
+from faults.session import MAX_LAG_FRAMES
+from faults.dispatcher import FAULT_FUNCTIONS, TABLE_FUNCTIONS
+from faults.sensor import SensorProfile
 
 class TestFaultFunctions(unittest.TestCase):
     def setUp(self):
@@ -23,5 +27,141 @@ class TestFaultFunctions(unittest.TestCase):
                 out = apply_fault(self.image, fault, 'medium')
                 self.assertEqual(out.shape, self.image.shape)
 
+    def test_spatial_jitter_offsets(self):
+        ramp = np.zeros((60, 200, 3), dtype=np.uint8)
+        ramp[..., 0] = np.arange(200, dtype=np.uint8)[None, :]
+        out = apply_fault(ramp, 'spatial_jitter', 'medium')
+        offsets = out[:, 3:-3, 0].astype(int) - np.arange(3, 197)[None, :]
+        self.assertEqual(set(np.unique(offsets)), set(range(-3, 4)))
+        self.assertAlmostEqual(offsets.mean(), 0, delta=0.1)
+
+    def test_rolling_shutter_skew_models(self):
+        from faults.emi import rolling_shutter_skew
+        image = np.full((40, 30, 3), 255, dtype=np.uint8)
+        for model in ['sine', 'velocity']:
+            for subpixel in [False, True]:
+                with self.subTest(model=model, subpixel=subpixel):
+                    out = rolling_shutter_skew(image, 'extreme', model=model, subpixel=subpixel)
+                    self.assertEqual(out.shape, image.shape)
+        out = rolling_shutter_skew(image, 'low', 'velocity')
+        # The first row is only shifted by the +/-2 jitter
+        self.assertGreaterEqual(int((out[0, :, 0] == 255).sum()), 28)
+
+    def test_table_faults_match_pointwise_formulas(self):
+        image = np.random.randint(0, 256, (20, 30, 3), dtype=np.uint8)
+        dropped = apply_fault(image, 'frame_drop', 'low', config={'frame_drop': {'low': 0.25}})
+        self.assertTrue(np.array_equal(dropped, (image * 0.25).astype(np.uint8)))
+        shifted = apply_fault(image, 'color_shift', 'medium')
+        self.assertTrue(np.array_equal(shifted[..., 1], image[..., 1]))
+        for fault, table_fn in TABLE_FUNCTIONS.items():
+            with self.subTest(fault=fault):
+                table = table_fn('medium')
+                self.assertEqual((table.shape, table.dtype), ((256, 3), np.uint8))
+
+    def test_batch_faults_run(self):
+        images = np.random.randint(0, 256, (4, 64, 80, 3), dtype=np.uint8)
+        for fault in FAULT_FUNCTIONS:
+            with self.subTest(fault=fault):
+                out = apply_fault_batch(images, fault, 'medium')
+                self.assertEqual(out.shape, images.shape)
+                self.assertEqual(out.dtype, np.uint8)
+
+    def test_batch_matches_single_for_fixed_faults(self):
+        images = np.random.randint(0, 256, (3, 32, 32, 3), dtype=np.uint8)
+        for fault in ['blackout', 'frame_drop']:
+            with self.subTest(fault=fault):
+                batch = apply_fault_batch(images, fault, 'low').astype(int)
+                single = np.stack([apply_fault(image, fault, 'low') for image in images]).astype(int)
+                self.assertLessEqual(np.abs(batch - single).max(), 1)
+
+    def test_batch_matches_single_with_same_generator(self):
+        images = np.random.randint(0, 256, (5, 33, 40, 3), dtype=np.uint8)
+        for fault in ['brightness', 'fog', 'color_shift', 'spatial_jitter', 'rolling_shutter_skew']:
+            with self.subTest(fault=fault):
+                batch = apply_fault_batch(images, fault, 'extreme', rng=np.random.default_rng(4))
+                rng = np.random.default_rng(4)
+                single = np.stack([apply_fault(image, fault, 'extreme', rng=rng) for image in images])
+                np.testing.assert_array_equal(batch, single)
+
+    def test_batch_rejects_single_image(self):
+        with self.assertRaises(ValueError):
+            apply_fault_batch(self.image, 'fog', 'low')
+
+    def test_chain_matches_sequential_faults(self):
+        image = np.random.randint(0, 256, (48, 64, 3), dtype=np.uint8)
+        chain = ['brightness', 'color_shift', 'fog', 'dead_pixels', 'salt_pepper_noise', 'blackout']
+        original = image.copy()
+        fused = apply_chain(image, chain, 'medium', rng=np.random.default_rng(5))
+        rng = np.random.default_rng(5)
+        expected = image
+        for fault in chain:
+            expected = apply_fault(expected, fault, 'medium', rng=rng)
+        self.assertTrue(np.array_equal(fused, expected))
+        self.assertTrue(np.array_equal(image, original))
+        joined = apply_fault(image, '+'.join(chain), 'medium', rng=np.random.default_rng(5))
+        self.assertTrue(np.array_equal(joined, expected))
+        with self.assertRaises(ValueError):
+            apply_chain(image, 'fog+nope', 'low')
+
+class TestSensorProfile(unittest.TestCase):
+    def setUp(self):
+        self.image = np.full((60, 80, 3), 128, dtype=np.uint8)
+
+    def test_defects_are_fixed_per_profile(self):
+        profile = SensorProfile(seed=3)
+        first = apply_fault(self.image, 'dead_pixels', 'medium')
+        self.assertTrue(np.array_equal(first, apply_fault(self.image, 'dead_pixels', 'medium')))
+        a = FAULT_FUNCTIONS['line_dropout'](self.image, 'extreme', profile=profile)
+        b = FAULT_FUNCTIONS['line_dropout'](self.image, 'extreme', profile=SensorProfile(seed=4))
+        self.assertFalse(np.array_equal(a, b))
+
+    def test_profile_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "camera"
+            hot = FAULT_FUNCTIONS['hot_pixels'](self.image, 'low', profile=SensorProfile(seed=9, path=path))
+            reloaded = SensorProfile(seed=9, path=path)
+            self.assertEqual(len(reloaded._maps), 1)
+            self.assertTrue(np.array_equal(hot, FAULT_FUNCTIONS['hot_pixels'](self.image, 'low', profile=reloaded)))
+            # A new map adds one file and leaves the existing ones alone
+            stamp = next((path / "seed_9").iterdir()).stat().st_mtime_ns
+            FAULT_FUNCTIONS['dead_pixels'](self.image, 'low', profile=reloaded)
+            self.assertEqual(len(list((path / "seed_9").iterdir())), 2)
+            self.assertEqual(min(p.stat().st_mtime_ns for p in (path / "seed_9").iterdir()), stamp)
+            self.assertEqual(len(SensorProfile(seed=10, path=path)._maps), 0)
+
+
+class TestFaultSession(unittest.TestCase):
+    def setUp(self):
+        # Frame n is filled with n so outputs show which input frame they came from
+        self.frames = [np.full((12, 16, 3), n, dtype=np.uint8) for n in range(20)]
+
+    def test_temporal_lag_reuses_ring_buffer(self):
+        session = FaultSession('temporal_lag', 'medium', config={'temporal_lag': {'medium': 3}})
+        out = np.empty_like(self.frames[0])
+        shown = [int(session.apply(frame, out=out)[0, 0, 0]) for frame in self.frames]
+        self.assertEqual(shown, [0, 0, 0, 0] + list(range(1, 17)))
+        self.assertEqual(session.steps[0][2].ring.shape, (4, 12, 16, 3))
+        # The ring buffer holds whole frames, so the lag is capped
+        session = FaultSession('temporal_lag', 'medium', config={'temporal_lag': {'medium': 100000}})
+        session.apply(self.frames[0])
+        self.assertEqual(len(session.steps[0][2].ring), MAX_LAG_FRAMES + 1)
+
+    def test_frame_drop_repeats_last_frame(self):
+        session = FaultSession('frame_drop', 'extreme', rng=np.random.default_rng(2))
+        shown = [int(session.apply(frame)[0, 0, 0]) for frame in self.frames]
+        self.assertEqual(sum(a == b for a, b in zip(shown, shown[1:])), session.dropped)
+        self.assertGreater(session.dropped, 0)
+        self.assertTrue(all(s <= n for n, s in enumerate(shown)))
+
+    def test_flicker_phase_continues_across_frames(self):
+        frame = np.full((100, 10, 3), 200, dtype=np.uint8)
+        # With the light at 1.5x the frame rate, frame 1 is half a cycle out of phase with frame 0,
+        # so the two gains (depth 0.8) add up to 2 - 0.8 on every row
+        session = FaultSession('flicker', 'extreme', fps=40, config={'flicker_depth': {'extreme': 0.8}, 'flicker_hz': 60})
+        first, second = session.apply(frame), session.apply(frame)
+        self.assertFalse(np.array_equal(first, second))
+        np.testing.assert_allclose(first[:, 0, 0].astype(int) + second[:, 0, 0], 200 * 1.2, atol=2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,7 +5,13 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 import unittest
 import tkinter as tk
+import threading
 from gui.interface import FaultInjectorApp
+import tempfile
+import cv2
+import numpy as np
+from gui.progress import ProgressChannel
+from gui.preview import PreviewRenderer
 class TestGUIInitialization(unittest.TestCase):
     def test_gui_loads(self):
         root = tk.Tk()
@@ -13,5 +19,29 @@ class TestGUIInitialization(unittest.TestCase):
         self.assertIsNotNone(app)
         root.destroy()
 
+class TestProgressChannel(unittest.TestCase):
+    def test_drain_coalesces_updates(self):
+        channel = ProgressChannel()
+        worker = threading.Thread(target=lambda: [channel.post("progress", (i, 1000)) for i in range(1, 1001)])
+        worker.start()
+        worker.join()
+        channel.post("done", 1.5)
+        self.assertEqual(channel.drain(), {"progress": (1000, 1000), "done": 1.5})
+        self.assertEqual(channel.drain(), {})
+
+class TestPreviewRenderer(unittest.TestCase):
+    def test_proxy_and_result_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "big.png")
+            cv2.imwrite(path, np.random.default_rng(0).integers(0, 256, (600, 800, 3), dtype=np.uint8))
+            renderer = PreviewRenderer(max_side=200)
+            renderer.set_image(path)
+        self.assertEqual(renderer.proxy.shape, (150, 200, 3))
+        first, _ = renderer.render("salt_pepper_noise", "medium", 40.0)
+        again, ms = renderer.render("salt_pepper_noise", "medium", 40.0)
+        self.assertIs(again, first)
+        self.assertEqual(ms, 0.0)
+        self.assertEqual(first.shape, renderer.proxy.shape)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import tempfile
+import unittest
+from core import io
+
+
+class TestListImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "input"
+        (self.root / "sub" / "deeper").mkdir(parents=True)
+        for name in ("a.jpg", "B.PNG", "c.WebP", "notes.txt", "sub/d.jpeg", "sub/deeper/e.png"):
+            (self.root / name).write_bytes(b"")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_case_insensitive_and_recursive(self):
+        names = lambda paths: sorted(p.relative_to(self.root).as_posix() for p in paths)
+        self.assertEqual(names(io.list_images(self.root)), ["B.PNG", "a.jpg", "c.WebP"])
+        self.assertEqual(names(io.list_images(self.root, recursive=True)),
+                         ["B.PNG", "a.jpg", "c.WebP", "sub/d.jpeg", "sub/deeper/e.png"])
+
+    def test_index_skips_walk(self):
+        index = Path(self.tmp.name) / "inputs.idx"
+        first = io.list_images(self.root, recursive=True, index_path=index)
+        (self.root / "new.jpg").write_bytes(b"")
+        self.assertEqual(io.list_images(self.root, recursive=True, index_path=index), first)
+        self.assertEqual(len(io.list_images(self.root, recursive=True, index_path=index, refresh=True)), 6)
+        # An index written for a different walk is ignored
+        self.assertEqual(len(io.list_images(self.root, index_path=index)), 4)
+
+    def test_abandoned_walk_leaves_no_index(self):
+        index = Path(self.tmp.name) / "inputs.idx"
+        paths = io.iter_images(self.root, index_path=index)
+        next(paths)
+        paths.close()
+        self.assertEqual(list(Path(self.tmp.name).glob("inputs.*")), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
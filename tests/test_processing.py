@@ -0,0 +1,238 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import json
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+import cv2
+import numpy as np
+from core import io
+from core.processing import run_generation
+from core.decode_cache import DecodeCache
+from core.catalog import Catalog
+from core.manifest import RunManifest, LEGACY_MANIFEST_NAME, file_hash
+
+
+class _Path:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class _App:
+    def __init__(self, input_path):
+        self.input_path = _Path(input_path)
+
+
+class TestRunGeneration(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_dir = Path(self.tmp.name) / "input"
+        self.input_dir.mkdir()
+        for name in ("a", "b"):
+            image = np.random.randint(0, 256, (48, 64, 3), dtype=np.uint8)
+            cv2.imwrite(str(self.input_dir / f"{name}.png"), image)
+        self.levels = ["low", "extreme"]
+        self.faults = {"EMI": ["color_shift", "rolling_shutter_skew"], "AI_Relevant": ["spatial_jitter"]}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _run(self, **kwargs):
+        output_dir = Path(self.tmp.name) / "_".join(["out"] + sorted(k for k, v in kwargs.items() if v is True))
+        summary = run_generation(_App(self.input_dir), self.levels, self.faults, output_dir,
+                                 resize_dims=(96, 72), **kwargs)
+        return output_dir, summary
+
+    def test_parallel_matches_serial_layout(self):
+        serial_dir, serial = self._run()
+        parallel_dir, parallel = self._run(parallel=True, workers=2)
+
+        strip = lambda summary: sorted((e["base_name"], e["level"], str(e["faults"])) for e in summary)
+        self.assertNotEqual(strip(serial), strip(parallel))
+        serial_dir, serial = self._run(seed=7)
+        parallel_dir, parallel = self._run(parallel=True, workers=2, seed=7)
+        self.assertEqual(strip(serial), strip(parallel))
+        for name in ("a_spatial_jitter_AI_Relevant_low.jpg", "b_rolling_shutter_skew_EMI_extreme.jpg"):
+            self.assertEqual((serial_dir / name).read_bytes(), (parallel_dir / name).read_bytes())
+        self.assertEqual(len(strip(serial)), 4)
+        self.assertEqual(sorted(p.name for p in serial_dir.iterdir()),
+                         sorted(p.name for p in parallel_dir.iterdir()))
+        self.assertIn("a_spatial_jitter_AI_Relevant_low.jpg", {p.name for p in parallel_dir.iterdir()})
+
+    def test_parallel_decodes_each_image_once(self):
+        _, summary = self._run(parallel=True, workers=2, timings=True, incremental=False)
+        decoded = [f for e in summary for f in e["faults"] if f["timings_ms"]["decode"] > 0]
+        self.assertEqual(len(decoded), 2)
+
+    def test_pipeline_matches_serial_layout(self):
+        serial_dir, serial = self._run(seed=7)
+        depths = []
+        pipeline_dir, pipelined = self._run(pipeline=True, workers=2, queue_size=2, stats_callback=depths.append,
+                                            seed=7)
+
+        strip = lambda summary: sorted((e["base_name"], e["level"], str(e["faults"])) for e in summary)
+        self.assertEqual(strip(serial), strip(pipelined))
+        self.assertEqual(sorted(p.name for p in serial_dir.iterdir()),
+                         sorted(p.name for p in pipeline_dir.iterdir()))
+        self.assertEqual(set(depths[-1]), {"decode", "fault", "encode", "write"})
+
+    def test_rerun_skips_current_outputs(self):
+        output_dir, first = self._run()
+        stamps = {p.name: p.stat().st_mtime_ns for p in output_dir.glob("*.jpg")}
+
+        self.faults["Hardware"] = ["dead_pixels"]
+        logs = []
+        _, second = self._run(log_callback=logs.append)
+        self.assertIn("Skipped 12 up-to-date outputs", logs)
+        self.assertEqual({len(entry["faults"]) for entry in second}, {4})
+        for name, stamp in stamps.items():
+            self.assertEqual((output_dir / name).stat().st_mtime_ns, stamp)
+
+        cv2.imwrite(str(self.input_dir / "a.png"), np.zeros((48, 64, 3), dtype=np.uint8))
+        logs = []
+        self._run(log_callback=logs.append)
+        self.assertIn("Skipped 8 up-to-date outputs", logs)
+
+    def test_manifest_saves_only_changes(self):
+        output_dir = Path(self.tmp.name) / "manifest"
+        output_dir.mkdir()
+        entry = {"input_hash": "abc", "fault": "fog", "level": "low", "config_hash": "1", "seed": 3,
+                 "config_snapshot": "s"}
+        (output_dir / LEGACY_MANIFEST_NAME).write_text(json.dumps({"inputs": {}, "outputs": {"old.jpg": entry}}))
+        manifest = RunManifest(output_dir)
+        self.assertFalse((output_dir / LEGACY_MANIFEST_NAME).exists())
+        manifest.record("new.jpg", {**entry, "fault": "blur"})
+        self.assertEqual(len(manifest.changed_outputs), 1)
+        manifest.close()
+        self.assertEqual(manifest.changed_outputs, {})
+
+        reopened = RunManifest(output_dir)
+        self.assertEqual(reopened.recorded("old.jpg"), {"filename": "old.jpg", **entry})
+        self.assertEqual(reopened.recorded("new.jpg")["fault"], "blur")
+        reopened.close()
+
+    def test_stage_timings(self):
+        for engine in ({}, {"pipeline": True, "workers": 2}):
+            with self.subTest(**engine):
+                reports = []
+                _, summary = self._run(timings=True, timings_callback=reports.append, incremental=False, **engine)
+                for entry in summary:
+                    for fault in entry["faults"]:
+                        self.assertEqual(list(fault["timings_ms"]), ["decode", "resize", "fault", "encode", "write"])
+                self.assertEqual(sum(r["units"] for r in reports[-1].values()), 12)
+                self.assertEqual(reports[-1]["color_shift"]["units"], 4)
+        _, summary = self._run(incremental=False)
+        self.assertNotIn("timings_ms", next(iter(summary))["faults"][0])
+
+    def test_trace_export(self):
+        trace_path = Path(self.tmp.name) / "run.trace.json"
+        _, summary = self._run(pipeline=True, workers=2, trace_path=trace_path, incremental=False)
+        self.assertNotIn("_trace_spans", next(iter(summary))["faults"][0])
+        events = json.loads(trace_path.read_text())["traceEvents"]
+        spans = [e for e in events if e["ph"] == "X"]
+        self.assertEqual(sum(e["name"] == "fault" for e in spans), 12)
+        self.assertEqual({e["name"] for e in spans}, {"decode", "resize", "fault", "encode", "write"})
+        tracks = {e["args"]["name"] for e in events if e["name"] == "thread_name"}
+        self.assertTrue({"decode-0", "fault-0", "fault-1", "write-0"} <= tracks)
+
+    def test_decode_cache(self):
+        cache_dir = Path(self.tmp.name) / "cache"
+        plain_dir, _ = self._run(seed=7)
+        for _ in range(2):
+            cached_dir, _ = self._run(seed=7, decode_cache=cache_dir, incremental=False)
+            self.assertEqual(len(list(cache_dir.glob("*.npy"))), 2)
+            for name in ("a_color_shift_EMI_low.jpg", "b_spatial_jitter_AI_Relevant_extreme.jpg"):
+                self.assertEqual((plain_dir / name).read_bytes(), (cached_dir / name).read_bytes())
+
+        # A pickled cache has no hash memo, so a known digest must spare it from hashing the file again
+        worker_cache = pickle.loads(pickle.dumps(DecodeCache(cache_dir)))
+        digest = file_hash(self.input_dir / "a.png")
+        with mock.patch("core.decode_cache.file_hash", side_effect=AssertionError):
+            worker_cache.load(self.input_dir / "a.png", (96, 72), digest=digest)
+        self.assertIs(pickle.loads(pickle.dumps(DecodeCache(cache_dir))), worker_cache)
+
+        cache = DecodeCache(cache_dir, max_bytes=96 * 72 * 3 + 200)
+        cache.load(self.input_dir / "a.png", (64, 48))
+        self.assertEqual(len(list(cache_dir.glob("*.npy"))), 1)
+
+    def test_metadata_log(self):
+        output_dir, log = self._run(seed=7)
+        log_path = output_dir / io.METADATA_LOG_NAME
+        strip = lambda entries: sorted((e["base_name"], e["level"], str(e["faults"])) for e in entries)
+        first = strip(log)
+        self.assertEqual(len(first), 4)
+        lines = log_path.read_text().count("\n")
+
+        # An incremental rerun keeps the earlier entries instead of writing them again
+        self.assertEqual(strip(self._run(seed=7)[1]), first)
+        self.assertEqual(log_path.read_text().count("\n"), lines)
+        # Recomputed entries are appended and replace the earlier ones
+        self.assertEqual(strip(self._run(seed=7, incremental=False)[1]), first)
+        self.assertEqual(log_path.read_text().count("\n"), 2 * lines)
+        self.assertEqual(log_path.with_suffix(".csv").read_text().count("\n"), 1 + 2 * 12)
+
+        with log_path.open("a") as f:
+            f.write('{"base_name": "trunc')
+        stage_timings = {"fog": {"units": 1}}
+        io.finalize_metadata(output_dir, formats=["json", "csv"], stage_timings=stage_timings)
+        exported = json.loads((output_dir / "global_metadata_summary.json").read_text())
+        self.assertEqual(strip(exported), first)
+        self.assertEqual((output_dir / "global_metadata_summary.csv").read_text().count("\n"), 1 + 12)
+        self.assertEqual(json.loads((output_dir / io.STAGE_TIMINGS_NAME).read_text()), stage_timings)
+
+        # A line cut short by a crash is dropped before the next run appends
+        self._run(seed=7)
+        self.assertEqual(strip(io.MetadataLog(log_path)), first)
+
+    def test_catalog(self):
+        catalog_path = Path(self.tmp.name) / "catalog.sqlite"
+        output_dir, _ = self._run(seed=7, timings=True, catalog=catalog_path)
+        catalog = Catalog(catalog_path)
+        self.assertEqual(catalog.count(), 12)
+        rows = catalog.select(category="EMI", level="extreme", base_name="a")
+        self.assertEqual(sorted(r["fault"] for r in rows), ["color_shift", "rolling_shutter_skew"])
+        self.assertEqual(rows[0]["size_bytes"], Path(rows[0]["path"]).stat().st_size)
+        self.assertIn("fault", rows[0]["timings_ms"])
+        self.assertEqual(len(catalog.paths(fault=["spatial_jitter", "color_shift"], input_glob="*/b.png")), 4)
+        with self.assertRaises(ValueError):
+            catalog.select(filename="x")
+        catalog.close()
+
+    def test_starts_before_listing_ends(self):
+        output_dir = Path(self.tmp.name) / "lazy"
+
+        def iter_images(*args, **kwargs):
+            yield self.input_dir / "a.png"
+            yield self.input_dir / "b.png"
+            # The walk is one path ahead of the plan, so every output of "a" exists by now
+            self.assertTrue((output_dir / "a_spatial_jitter_AI_Relevant_extreme.jpg").exists())
+
+        calls = []
+        with mock.patch.object(io, "iter_images", iter_images):
+            run_generation(_App(self.input_dir), self.levels, self.faults, output_dir,
+                           progress_callback=lambda c, t: calls.append((c, t)))
+        self.assertEqual((calls[0], calls[-1]), ((1, None), (12, 12)))
+
+    def test_cancel_before_start_is_kept(self):
+        app = _App(self.input_dir)
+        app.cancel_flag = [True]
+        output_dir = Path(self.tmp.name) / "cancelled"
+        log = run_generation(app, self.levels, self.faults, output_dir)
+        self.assertEqual(list(log), [])
+        self.assertEqual(list(output_dir.glob("*.jpg")), [])
+
+    def test_progress_reaches_total(self):
+        calls = []
+        self._run(parallel=True, workers=2, progress_callback=lambda c, t: calls.append((c, t)))
+        self.assertEqual(calls[-1], (12, 12))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import io
+import json
+import subprocess
+import unittest
+import numpy as np
+from core.realtime import LatencyHistogram, RealtimeInjector, run_realtime
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for ms in range(1, 101):
+            histogram.record(float(ms))
+        self.assertAlmostEqual(histogram.percentile(50), 50, delta=50 * 0.025)
+        self.assertAlmostEqual(histogram.percentile(99), 99, delta=99 * 0.025)
+        self.assertEqual(histogram.percentile(100), 100)
+        self.assertEqual(sum(count for _, count in histogram.to_dict()["buckets"]), 100)
+
+
+class TestRealtime(unittest.TestCase):
+    def setUp(self):
+        self.frames = np.random.default_rng(0).integers(0, 256, (6, 48, 64, 3), dtype=np.uint8)
+
+    def _run(self, fault, budget_ms, pixel_format="rgb24"):
+        injector = RealtimeInjector(fault, "medium", (64, 48), budget_ms=budget_ms, seed=1)
+        sink = io.BytesIO()
+        stats = run_realtime(io.BytesIO(self.frames.tobytes()), sink, injector, pixel_format=pixel_format)
+        return stats, np.frombuffer(sink.getvalue(), dtype=np.uint8).reshape(-1, 48, 64, 3)
+
+    def test_faults_every_frame_within_budget(self):
+        stats, out = self._run("fog+temporal_lag", budget_ms=10000)
+        self.assertEqual(len(out), 6)
+        self.assertEqual(stats["plans"], {"full": 6, "simplified": 0, "passthrough": 0})
+        self.assertEqual(stats["latency_ms"]["count"], 6)
+        self.assertFalse(np.array_equal(out[0], self.frames[0]))
+
+    def test_degrades_when_over_budget(self):
+        stats, out = self._run("warping", budget_ms=1e-6, pixel_format="bgr24")
+        # Each plan is tried once before it has a cost estimate; after that nothing fits and frames pass
+        # through. Simplified warping drops the warp itself, so it leaves the frame untouched too
+        self.assertEqual(stats["plans"], {"full": 1, "simplified": 1, "passthrough": 4})
+        self.assertEqual(stats["missed_deadlines"], 6)
+        np.testing.assert_array_equal(out[1:], self.frames[1:])
+
+    def test_command_line_pipes(self):
+        result = subprocess.run([sys.executable, str(ROOT / "realtime.py"), "--size", "64x48", "--fault", "flicker"],
+                                input=self.frames.tobytes(), capture_output=True, cwd=ROOT)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(len(result.stdout), self.frames.nbytes)
+        self.assertEqual(json.loads(result.stderr)["frames"], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
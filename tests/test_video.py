@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from core import io
+from core.video import iter_frames, process_stream, process_streams
+from core.config_editor import get_config
+from faults import apply_fault
+from faults.rng import unit_seed
+
+
+class TestProcessStream(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.frames = self.root / "frames"
+        self.frames.mkdir()
+        rng = np.random.default_rng(0)
+        # Unpadded names so natural ordering matters: 2 must come before 10
+        for i in range(12):
+            cv2.imwrite(str(self.frames / f"f{i}.png"), rng.integers(0, 256, (24, 32, 3), dtype=np.uint8))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_frames_keep_order_and_seed(self):
+        out = self.root / "out"
+        summary = process_stream(self.frames, out, "salt_pepper_noise", "medium", seed=7, workers=3, queue_size=2)
+        self.assertEqual(summary["frames"], 12)
+        for i in range(12):
+            frame = io.read_image(self.frames / f"f{i}.png")
+            rng = np.random.default_rng(unit_seed(7, "frames", "salt_pepper_noise", "medium", frame=i))
+            expected = apply_fault(frame, "salt_pepper_noise", "medium", rng=rng, config=get_config())
+            np.testing.assert_array_equal(io.read_image(out / f"{i:06d}.png"), expected)
+
+    def test_branches_match_single_streams(self):
+        branches = [(self.root / "fan" / "noise", "salt_pepper_noise", "medium"),
+                    (self.root / "fan" / "lag", "temporal_lag+blur", "low")]
+        summaries = process_streams(self.frames, branches, seed=3, workers=2, queue_size=2)
+        for (out, fault, level), summary in zip(branches, summaries):
+            self.assertEqual((summary["type"], summary["frames"]), (fault, 12))
+            single = self.root / "single" / out.name
+            process_stream(self.frames, single, fault, level, seed=3)
+            for i in range(12):
+                np.testing.assert_array_equal(io.read_image(out / f"{i:06d}.png"),
+                                              io.read_image(single / f"{i:06d}.png"))
+
+    def test_video_round_trip(self):
+        clip = self.root / "clip.avi"
+        process_stream(self.frames, clip, "blur", "low", fps=24)
+        frames = list(iter_frames(clip, resize_dims=(16, 12)))
+        self.assertEqual(len(frames), 12)
+        self.assertEqual(frames[0].shape, (12, 16, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()